@@ -7,15 +7,25 @@ K-SHOT RAG PIPELINE (XML-BASED EXAMPLES)
 - Postgres = source of truth
 """
 
-from typing import List, Dict
+from typing import List, Dict, Optional
 import os
-import xml.etree.ElementTree as ET
+import hashlib
+from functools import lru_cache
+import orjson
+import asyncio
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from lxml import etree as ET
+import numpy as np
 import psycopg2
-from psycopg2.extras import RealDictCursor
+import asyncpg
 import weaviate
 from weaviate.classes.query import MetadataQuery
 from qgenie.integrations.langchain.embeddings import QGenieEmbeddings
 
+from embedding_cache import QueryEmbeddingCache, EmbeddingBatcher
+
 
 # -------------------------------------------------------------------
 # CONFIG
@@ -23,10 +33,17 @@ from qgenie.integrations.langchain.embeddings import QGenieEmbeddings
 
 WEAVIATE_COLLECTION = "PolicyChunks"
 K = 5
+SEARCH_BATCH_WORKERS = 8
 
 KSHOT_XML_DIR = "/data/kshot_examples_xml"   # 👈 XML now
+# App-owned 0700 directory; a shared /tmp path could be swapped by other users
+KSHOT_CACHE_DIR = os.getenv(
+    "KSHOT_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "simplerag")
+)
+KSHOT_CACHE_PATH = os.path.join(KSHOT_CACHE_DIR, "kshot_examples_xml.json")
 WEAVIATE_HOST = "rag-weaviate"
 WEAVIATE_PORT = 8080
+EMBED_MODEL = "text-embedding-3-large"
 
 POSTGRES_DSN = {
     "host": "rag-postgres",
@@ -41,28 +58,151 @@ POSTGRES_DSN = {
 # CLIENTS
 # -------------------------------------------------------------------
 
+_WEAVIATE_CLIENT = None
+_WEAVIATE_LOCK = threading.Lock()
+
+
 def get_weaviate_client():
-    return weaviate.connect_to_custom(
-        http_host=WEAVIATE_HOST,
-        http_port=WEAVIATE_PORT,
-        http_secure=False,
-        grpc_host=WEAVIATE_HOST,
-        grpc_port=50051,
-        grpc_secure=False,
-        skip_init_checks=True,
-    )
+    """
+    Process-wide Weaviate client (connected once, closed at exit)
+    """
+    global _WEAVIATE_CLIENT
+
+    if _WEAVIATE_CLIENT is None:
+        with _WEAVIATE_LOCK:
+            if _WEAVIATE_CLIENT is None:
+                _WEAVIATE_CLIENT = weaviate.connect_to_custom(
+                    http_host=WEAVIATE_HOST,
+                    http_port=WEAVIATE_PORT,
+                    http_secure=False,
+                    grpc_host=WEAVIATE_HOST,
+                    grpc_port=50051,
+                    grpc_secure=False,
+                    skip_init_checks=True,
+                )
+                atexit.register(_WEAVIATE_CLIENT.close)
+
+    return _WEAVIATE_CLIENT
 
 
 def get_pg_conn():
     return psycopg2.connect(**POSTGRES_DSN)
 
 
+_PG_POOL = None
+_PG_POOL_LOCK = asyncio.Lock()
+
+
+async def get_pg_pool() -> asyncpg.Pool:
+    """
+    Shared asyncpg pool for the async request path
+    """
+    global _PG_POOL
+
+    if _PG_POOL is None:
+        async with _PG_POOL_LOCK:
+            if _PG_POOL is None:
+                _PG_POOL = await asyncpg.create_pool(
+                    host=POSTGRES_DSN["host"],
+                    port=POSTGRES_DSN["port"],
+                    database=POSTGRES_DSN["dbname"],
+                    user=POSTGRES_DSN["user"],
+                    password=POSTGRES_DSN["password"],
+                    min_size=4,
+                    max_size=32,
+                )
+
+    return _PG_POOL
+
+
+# Built once per process so the SDK HTTP session (and TLS) is reused
+@lru_cache(maxsize=1)
 def get_embedder():
     return QGenieEmbeddings(
-        model="text-embedding-3-large"
+        model=EMBED_MODEL
     )
 
 
+# -------------------------------------------------------------------
+# QUERY EMBEDDING CACHE
+# -------------------------------------------------------------------
+
+_QUERY_CACHE = QueryEmbeddingCache(max_size=2000, ttl_seconds=300)
+
+
+def kshot_signature() -> str:
+    """
+    Fingerprint of the k-shot XML files.
+    The directory mtime catches adds/deletes/renames; per-file
+    (name, mtime, size) catches edits and copies with an older mtime.
+    """
+    files = []
+    with os.scandir(KSHOT_XML_DIR) as it:
+        for entry in it:
+            if not entry.name.endswith(".xml"):
+                continue
+            st = entry.stat()
+            files.append((entry.name, st.st_mtime_ns, st.st_size))
+    files.sort()
+
+    state = (os.stat(KSHOT_XML_DIR).st_mtime_ns, files)
+    return hashlib.blake2b(repr(state).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def cached_embed(text: str) -> np.ndarray:
+    key = QueryEmbeddingCache.make_key(text, EMBED_MODEL)
+
+    vector = _QUERY_CACHE.get(key)
+    if vector is None:
+        vector = np.asarray(get_embedder().embed_query(text), dtype=np.float32)
+        _QUERY_CACHE.put(key, vector)
+
+    return vector
+
+
+def cached_embed_batch(texts: List[str]) -> List[np.ndarray]:
+    """
+    Embed many query texts with one embed_documents call.
+    Cache hits are served directly; only misses go to the embedder.
+    """
+    keys = [QueryEmbeddingCache.make_key(t, EMBED_MODEL) for t in texts]
+    vectors = [_QUERY_CACHE.get(k) for k in keys]
+
+    to_embed = [i for i, v in enumerate(vectors) if v is None]
+    if to_embed:
+        # One float32 matrix for the whole batch; each query gets a row view
+        embedded = np.asarray(
+            get_embedder().embed_documents([texts[i] for i in to_embed]),
+            dtype=np.float32,
+        )
+        for i, vec in zip(to_embed, embedded):
+            vectors[i] = vec
+            _QUERY_CACHE.put(keys[i], vec)
+
+    return vectors
+
+
+_BATCHER = EmbeddingBatcher(
+    lambda texts: get_embedder().embed_documents(texts),
+    window_ms=20,
+    max_batch=64,
+)
+
+
+async def cached_embed_async(text: str) -> np.ndarray:
+    """
+    Async variant: concurrent callers are coalesced by the micro-batcher
+    """
+    key = QueryEmbeddingCache.make_key(text, EMBED_MODEL)
+
+    vector = _QUERY_CACHE.get(key)
+    if vector is None:
+        vector = await _BATCHER.embed(text)
+        _QUERY_CACHE.put(key, vector)
+
+    return vector
+
+
 # -------------------------------------------------------------------
 # XML → CHUNK_TEXT (same logic as ingestion)
 # -------------------------------------------------------------------
@@ -73,6 +213,15 @@ def safe_text(el, default="Not specified"):
     return el.text.strip()
 
 
+def free_element(el):
+    """
+    Drop a processed iterparse element and its already-seen siblings
+    """
+    el.clear()
+    while el.getprevious() is not None:
+        del el.getparent()[0]
+
+
 def build_chunk_text(prtn: ET.Element) -> str:
     index = prtn.attrib.get("index", "unknown")
     profile = prtn.attrib.get("profile", "unknown")
@@ -104,26 +253,108 @@ def build_chunk_text(prtn: ET.Element) -> str:
 # LOAD K-SHOT EXAMPLES FROM XML
 # -------------------------------------------------------------------
 
+_KSHOT_CACHE = {"signature": None, "max_examples": None, "examples": None}
+
+
 def load_kshot_examples_from_xml(max_examples: int = 5) -> List[str]:
     """
     Parse XML files and extract chunk_text from <PRTn>
+    Cached until any XML file changes on disk.
     """
+    signature = kshot_signature()
+    if (
+        _KSHOT_CACHE["examples"] is not None
+        and _KSHOT_CACHE["signature"] == signature
+        and _KSHOT_CACHE["max_examples"] == max_examples
+    ):
+        return _KSHOT_CACHE["examples"]
+
+    examples = _read_examples_cache(signature, max_examples)
+    if examples is None:
+        examples = _parse_kshot_xml_dir(max_examples)
+        _write_examples_cache(signature, max_examples, examples)
+
+    _KSHOT_CACHE["signature"] = signature
+    _KSHOT_CACHE["max_examples"] = max_examples
+    _KSHOT_CACHE["examples"] = examples
+    return examples
+
+
+def _private_cache_dir() -> Optional[str]:
+    try:
+        os.makedirs(KSHOT_CACHE_DIR, mode=0o700, exist_ok=True)
+        st = os.stat(KSHOT_CACHE_DIR)
+    except OSError:
+        return None
+    # Only trust a directory we own that nobody else can write to
+    if st.st_uid != os.getuid() or st.st_mode & 0o077:
+        return None
+    return KSHOT_CACHE_DIR
+
+
+def _read_examples_cache(signature: str, limit: int) -> Optional[List[str]]:
+    if _private_cache_dir() is None:
+        return None
+    try:
+        with open(KSHOT_CACHE_PATH, "rb") as f:
+            cached = orjson.loads(f.read())
+        if cached["signature"] == signature and cached["limit"] == limit:
+            examples = cached["examples"]
+            if isinstance(examples, list) and all(isinstance(e, str) for e in examples):
+                return examples
+    except Exception:
+        # Missing, truncated or foreign file: just a cache miss
+        pass
+    return None
+
+
+def _write_examples_cache(signature: str, limit: int, examples: List[str]):
+    if _private_cache_dir() is None:
+        return
+    # Write-then-rename so concurrent workers never read a partial file
+    tmp_path = f"{KSHOT_CACHE_PATH}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps({"signature": signature, "limit": limit, "examples": examples}))
+        os.replace(tmp_path, KSHOT_CACHE_PATH)
+    except OSError:
+        pass
+
+
+def _parse_kshot_xml_file(path: str, max_examples: int) -> List[str]:
     examples = []
 
-    for fname in sorted(os.listdir(KSHOT_XML_DIR)):
-        if not fname.endswith(".xml"):
-            continue
+    for _, prtn in ET.iterparse(path, events=("end",), tag="PRTn"):
+        examples.append(build_chunk_text(prtn))
+        free_element(prtn)
+        if len(examples) >= max_examples:
+            break
+
+    return examples
 
-        path = os.path.join(KSHOT_XML_DIR, fname)
-        tree = ET.parse(path)
-        root = tree.getroot()
 
-        for prtn in root.findall(".//PRTn"):
-            examples.append(build_chunk_text(prtn))
+def _parse_kshot_xml_dir(max_examples: int) -> List[str]:
+    paths = [
+        os.path.join(KSHOT_XML_DIR, fname)
+        for fname in sorted(os.listdir(KSHOT_XML_DIR))
+        if fname.endswith(".xml")
+    ]
+    if not paths:
+        return []
+
+    # lxml parses in C with the GIL released, so files parse in parallel;
+    # map() keeps results in sorted file order.
+    workers = min(8, os.cpu_count() or 1, len(paths))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        per_file = pool.map(lambda p: _parse_kshot_xml_file(p, max_examples), paths)
+
+        examples = []
+        for file_examples in per_file:
+            examples.extend(file_examples)
             if len(examples) >= max_examples:
-                return examples
+                break
 
-    return examples
+    return examples[:max_examples]
 
 
 # -------------------------------------------------------------------
@@ -131,19 +362,14 @@ def load_kshot_examples_from_xml(max_examples: int = 5) -> List[str]:
 # -------------------------------------------------------------------
 
 def build_kshot_query(user_query: str, examples: List[str]) -> str:
-    parts = [
+    return "\n".join([
         "You are searching access control policy knowledge.",
         "Below are example policy regions:\n",
-    ]
-
-    for i, ex in enumerate(examples, 1):
-        parts.append(f"Example {i}:\n{ex}\n")
-
-    parts.append("User query:")
-    parts.append(user_query)
-    parts.append("\nFind the most relevant policy regions.")
-
-    return "\n".join(parts)
+        *[f"Example {i}:\n{ex}\n" for i, ex in enumerate(examples, 1)],
+        "User query:",
+        user_query,
+        "\nFind the most relevant policy regions.",
+    ])
 
 
 # -------------------------------------------------------------------
@@ -151,76 +377,119 @@ def build_kshot_query(user_query: str, examples: List[str]) -> str:
 # -------------------------------------------------------------------
 
 def search_weaviate(query_vector: List[float], top_k: int) -> List[Dict]:
-    client = get_weaviate_client()
-    col = client.collections.get(WEAVIATE_COLLECTION)
+    col = get_weaviate_client().collections.get(WEAVIATE_COLLECTION)
+    return _near_vector_hits(col, query_vector, top_k)
+
 
+def _near_vector_hits(col, query_vector, top_k: int) -> List[Dict]:
     res = col.query.near_vector(
         vector=query_vector,
         limit=top_k,
         return_metadata=MetadataQuery(distance=True)
     )
-
-    hits = [
-        {
-            "vector_id": str(obj.uuid),
-            "distance": obj.metadata.distance
-        }
+    return [
+        {"vector_id": str(obj.uuid), "distance": obj.metadata.distance}
         for obj in res.objects
     ]
 
-    client.close()
-    return hits
+
+def search_weaviate_batch(query_vectors: List[List[float]], top_k: int) -> List[List[Dict]]:
+    """
+    Run several near_vector searches concurrently over the shared client
+    """
+    col = get_weaviate_client().collections.get(WEAVIATE_COLLECTION)
+
+    workers = max(1, min(SEARCH_BATCH_WORKERS, len(query_vectors)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda v: _near_vector_hits(col, v, top_k), query_vectors))
 
 
 # -------------------------------------------------------------------
-# POSTGRES FETCH
+# POSTGRES FETCH + SCORE MERGE
 # -------------------------------------------------------------------
+# Hits are passed as parallel (vector_id, distance) arrays; Postgres joins
+# them against policy_chunks, projects the similarity score and returns
+# rows already in Weaviate rank order.
+
+RANKED_CHUNKS_COLUMNS = """
+        p.id,
+        p.project,
+        p.version,
+        p.mpu_name,
+        p.rg_index,
+        p.profile,
+        p.start_hex,
+        p.end_hex,
+        p.chunk_index,
+        p.chunk_text,
+        p.vector_id,
+        1.0 / (1.0 + q.dist) AS semantic_score,
+        q.ord - 1 AS rank
+"""
 
-def fetch_chunks_by_vector_ids(pg_conn, vector_ids: List[str]) -> List[Dict]:
-    sql = """
-    SELECT
-        id,
-        project,
-        version,
-        mpu_name,
-        rg_index,
-        profile,
-        start_hex,
-        end_hex,
-        chunk_index,
-        chunk_text,
-        vector_id
-    FROM policy_chunks
-    WHERE vector_id = ANY(%s)
-      AND is_active = TRUE
+RANKED_CHUNKS_FIELDS = (
+    "id",
+    "project",
+    "version",
+    "mpu_name",
+    "rg_index",
+    "profile",
+    "start_hex",
+    "end_hex",
+    "chunk_index",
+    "chunk_text",
+    "vector_id",
+    "semantic_score",
+    "rank",
+)
+
+
+def fetch_ranked_chunks(pg_conn, hits: List[Dict]) -> List[Dict]:
+    if not hits:
+        return []
+
+    sql = f"""
+    WITH q AS (
+        SELECT * FROM unnest(%s::text[], %s::float8[])
+            WITH ORDINALITY AS t(vid, dist, ord)
+    )
+    SELECT {RANKED_CHUNKS_COLUMNS}
+    FROM policy_chunks p
+    JOIN q ON p.vector_id = q.vid
+    WHERE p.is_active = TRUE
+    ORDER BY q.ord
     """
 
-    with pg_conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(sql, (vector_ids,))
-        return cur.fetchall()
-
+    with pg_conn.cursor() as cur:
+        cur.execute(sql, (
+            [h["vector_id"] for h in hits],
+            [h["distance"] for h in hits],
+        ))
+        return [dict(zip(RANKED_CHUNKS_FIELDS, row)) for row in cur.fetchall()]
 
-# -------------------------------------------------------------------
-# SCORE MERGE
-# -------------------------------------------------------------------
 
-def merge_scores(weaviate_hits, pg_chunks):
-    score_map = {
-        h["vector_id"]: 1 / (1 + h["distance"])
-        for h in weaviate_hits
-    }
-    order_map = {h["vector_id"]: i for i, h in enumerate(weaviate_hits)}
+async def fetch_ranked_chunks_async(pool: asyncpg.Pool, hits: List[Dict]) -> List[asyncpg.Record]:
+    if not hits:
+        return []
 
-    enriched = []
-    for c in pg_chunks:
-        enriched.append({
-            **c,
-            "semantic_score": score_map.get(c["vector_id"], 0.0),
-            "rank": order_map.get(c["vector_id"], 999),
-        })
+    sql = f"""
+    WITH q AS (
+        SELECT * FROM unnest($1::text[], $2::float8[])
+            WITH ORDINALITY AS t(vid, dist, ord)
+    )
+    SELECT {RANKED_CHUNKS_COLUMNS}
+    FROM policy_chunks p
+    JOIN q ON p.vector_id = q.vid
+    WHERE p.is_active = TRUE
+    ORDER BY q.ord
+    """
 
-    enriched.sort(key=lambda x: x["rank"])
-    return enriched
+    async with pool.acquire() as conn:
+        return await conn.fetch(
+            sql,
+            [h["vector_id"] for h in hits],
+            [h["distance"] for h in hits],
+        )
 
 
 # -------------------------------------------------------------------
@@ -231,16 +500,45 @@ def run_kshot_rag(user_query: str):
     examples = load_kshot_examples_from_xml()
     query_text = build_kshot_query(user_query, examples)
 
-    embedder = get_embedder()
-    query_vector = embedder.embed_query(query_text)
+    query_vector = cached_embed(query_text)
 
     hits = search_weaviate(query_vector, K)
 
     pg = get_pg_conn()
-    chunks = fetch_chunks_by_vector_ids(pg, [h["vector_id"] for h in hits])
+    chunks = fetch_ranked_chunks(pg, hits)
+    pg.close()
+
+    return chunks
+
+
+async def run_kshot_rag_async(user_query: str):
+    examples = load_kshot_examples_from_xml()
+    query_text = build_kshot_query(user_query, examples)
+
+    query_vector = await cached_embed_async(query_text)
+
+    hits = await asyncio.to_thread(search_weaviate, query_vector, K)
+
+    pool = await get_pg_pool()
+    chunks = await fetch_ranked_chunks_async(pool, hits)
+
+    return [dict(c) for c in chunks]
+
+
+def run_kshot_rag_batch(user_queries: List[str]) -> List[List[Dict]]:
+    examples = load_kshot_examples_from_xml()
+    query_texts = [build_kshot_query(q, examples) for q in user_queries]
+
+    query_vectors = cached_embed_batch(query_texts)
+    batch_hits = search_weaviate_batch(query_vectors, K)
+
+    results = []
+    pg = get_pg_conn()
+    for hits in batch_hits:
+        results.append(fetch_ranked_chunks(pg, hits))
     pg.close()
 
-    return merge_scores(hits, chunks)
+    return results
 
 
 if __name__ == "__main__":
@@ -9,25 +9,43 @@ Responsibilities:
 - Postgres → source of truth
 """
 
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import os
-import xml.etree.ElementTree as ET
+from functools import lru_cache
+import orjson
+import asyncio
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from lxml import etree as ET
+import numpy as np
 import psycopg2
-from psycopg2.extras import RealDictCursor
+import asyncpg
 import weaviate
 from weaviate.classes.query import MetadataQuery
 
 from qgenie.integrations.langchain.embeddings import QGenieEmbeddings
 from qgenie.llm import QGenieLLM
 
+from embedding_cache import LRUTTLCache, QueryEmbeddingCache, EmbeddingBatcher
+
 
 # -------------------------------------------------------------------
 # CONFIG
 # -------------------------------------------------------------------
 
 KSHOT_XML_PATH = "/data/kshot_examples.xml"
+# App-owned 0700 directory; a shared /tmp path could be swapped by other users
+KSHOT_CACHE_DIR = os.getenv(
+    "KSHOT_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "simplerag")
+)
+KSHOT_CACHE_PATH = os.path.join(KSHOT_CACHE_DIR, "kshot_examples.json")
 WEAVIATE_COLLECTION = "PolicyChunks"
 TOP_K = 8
+SEARCH_BATCH_WORKERS = 8
+
+# Skip the LLM rewrite when the raw query's top hit is already this close
+REWRITE_SKIP_DISTANCE = 0.15
 
 POSTGRES_DSN = {
     "host": "rag-postgres",
@@ -39,6 +57,7 @@ POSTGRES_DSN = {
 
 WEAVIATE_HOST = "rag-weaviate"
 WEAVIATE_PORT = 8080
+EMBED_MODEL = "text-embedding-3-large"
 
 
 # -------------------------------------------------------------------
@@ -49,23 +68,128 @@ def get_pg():
     return psycopg2.connect(**POSTGRES_DSN)
 
 
+_PG_POOL = None
+_PG_POOL_LOCK = asyncio.Lock()
+
+
+async def get_pg_pool() -> asyncpg.Pool:
+    """
+    Shared asyncpg pool for the async request path
+    """
+    global _PG_POOL
+
+    if _PG_POOL is None:
+        async with _PG_POOL_LOCK:
+            if _PG_POOL is None:
+                _PG_POOL = await asyncpg.create_pool(
+                    host=POSTGRES_DSN["host"],
+                    port=POSTGRES_DSN["port"],
+                    database=POSTGRES_DSN["dbname"],
+                    user=POSTGRES_DSN["user"],
+                    password=POSTGRES_DSN["password"],
+                    min_size=4,
+                    max_size=32,
+                )
+
+    return _PG_POOL
+
+
+_WEAVIATE_CLIENT = None
+_WEAVIATE_LOCK = threading.Lock()
+
+
 def get_weaviate():
-    return weaviate.connect_to_custom(
-        http_host=WEAVIATE_HOST,
-        http_port=WEAVIATE_PORT,
-        http_secure=False,
-        skip_init_checks=True,
-    )
+    """
+    Process-wide Weaviate client (connected once, closed at exit)
+    """
+    global _WEAVIATE_CLIENT
+
+    if _WEAVIATE_CLIENT is None:
+        with _WEAVIATE_LOCK:
+            if _WEAVIATE_CLIENT is None:
+                _WEAVIATE_CLIENT = weaviate.connect_to_custom(
+                    http_host=WEAVIATE_HOST,
+                    http_port=WEAVIATE_PORT,
+                    http_secure=False,
+                    skip_init_checks=True,
+                )
+                atexit.register(_WEAVIATE_CLIENT.close)
 
+    return _WEAVIATE_CLIENT
 
+
+# Built once per process so the SDK HTTP session (and TLS) is reused
+@lru_cache(maxsize=1)
 def get_embedder():
-    return QGenieEmbeddings(model="text-embedding-3-large")
+    return QGenieEmbeddings(model=EMBED_MODEL)
 
 
+@lru_cache(maxsize=1)
 def get_llm():
     return QGenieLLM(model="qgenie-pro")
 
 
+# -------------------------------------------------------------------
+# QUERY EMBEDDING CACHE
+# -------------------------------------------------------------------
+
+_QUERY_CACHE = QueryEmbeddingCache(max_size=2000, ttl_seconds=300)
+
+
+def cached_embed(text: str) -> np.ndarray:
+    key = QueryEmbeddingCache.make_key(text, EMBED_MODEL)
+
+    vector = _QUERY_CACHE.get(key)
+    if vector is None:
+        vector = np.asarray(get_embedder().embed_query(text), dtype=np.float32)
+        _QUERY_CACHE.put(key, vector)
+
+    return vector
+
+
+def cached_embed_batch(texts: List[str]) -> List[np.ndarray]:
+    """
+    Embed many query texts with one embed_documents call.
+    Cache hits are served directly; only misses go to the embedder.
+    """
+    keys = [QueryEmbeddingCache.make_key(t, EMBED_MODEL) for t in texts]
+    vectors = [_QUERY_CACHE.get(k) for k in keys]
+
+    to_embed = [i for i, v in enumerate(vectors) if v is None]
+    if to_embed:
+        # One float32 matrix for the whole batch; each query gets a row view
+        embedded = np.asarray(
+            get_embedder().embed_documents([texts[i] for i in to_embed]),
+            dtype=np.float32,
+        )
+        for i, vec in zip(to_embed, embedded):
+            vectors[i] = vec
+            _QUERY_CACHE.put(keys[i], vec)
+
+    return vectors
+
+
+_BATCHER = EmbeddingBatcher(
+    lambda texts: get_embedder().embed_documents(texts),
+    window_ms=20,
+    max_batch=64,
+)
+
+
+async def cached_embed_async(text: str) -> np.ndarray:
+    """
+    Async variant: concurrent callers are coalesced by the micro-batcher
+    """
+    key = QueryEmbeddingCache.make_key(text, EMBED_MODEL)
+
+    vector = _QUERY_CACHE.get(key)
+    if vector is None:
+        vector = await _BATCHER.embed(text)
+        _QUERY_CACHE.put(key, vector)
+
+    return vector
+
+
 # -------------------------------------------------------------------
 # HELPERS
 # -------------------------------------------------------------------
@@ -74,6 +198,15 @@ def safe_text(el, default="Not specified"):
     return el.text.strip() if el is not None and el.text else default
 
 
+def free_element(el):
+    """
+    Drop a processed iterparse element and its already-seen siblings
+    """
+    el.clear()
+    while el.getprevious() is not None:
+        del el.getparent()[0]
+
+
 # -------------------------------------------------------------------
 # BUILD CHUNK TEXT (NORMALIZE PROJECT + RELEASE FOR KSHOT ONLY)
 # -------------------------------------------------------------------
@@ -116,14 +249,82 @@ def build_chunk_text(
 # LOAD KSHOT EXAMPLES (XML → TEXT)
 # -------------------------------------------------------------------
 
+_KSHOT_CACHE = {"mtime_ns": None, "limit": None, "examples": None}
+
+
 def load_kshot_examples(limit: int = 6) -> List[str]:
-    tree = ET.parse(KSHOT_XML_PATH)
-    root = tree.getroot()
+    mtime_ns = os.stat(KSHOT_XML_PATH).st_mtime_ns
+    if (
+        _KSHOT_CACHE["examples"] is not None
+        and _KSHOT_CACHE["mtime_ns"] == mtime_ns
+        and _KSHOT_CACHE["limit"] == limit
+    ):
+        return _KSHOT_CACHE["examples"]
+
+    examples = _read_examples_cache(mtime_ns, limit)
+    if examples is None:
+        examples = _parse_kshot_xml(limit)
+        _write_examples_cache(mtime_ns, limit, examples)
+
+    _KSHOT_CACHE["mtime_ns"] = mtime_ns
+    _KSHOT_CACHE["limit"] = limit
+    _KSHOT_CACHE["examples"] = examples
+    return examples
 
-    release = root.findtext("Version", "<RELEASE>")
+
+def _private_cache_dir() -> Optional[str]:
+    try:
+        os.makedirs(KSHOT_CACHE_DIR, mode=0o700, exist_ok=True)
+        st = os.stat(KSHOT_CACHE_DIR)
+    except OSError:
+        return None
+    # Only trust a directory we own that nobody else can write to
+    if st.st_uid != os.getuid() or st.st_mode & 0o077:
+        return None
+    return KSHOT_CACHE_DIR
+
+
+def _read_examples_cache(mtime_ns: int, limit: int) -> Optional[List[str]]:
+    if _private_cache_dir() is None:
+        return None
+    try:
+        with open(KSHOT_CACHE_PATH, "rb") as f:
+            cached = orjson.loads(f.read())
+        if cached["mtime"] == mtime_ns and cached["limit"] == limit:
+            examples = cached["examples"]
+            if isinstance(examples, list) and all(isinstance(e, str) for e in examples):
+                return examples
+    except Exception:
+        # Missing, truncated or foreign file: just a cache miss
+        pass
+    return None
+
+
+def _write_examples_cache(mtime_ns: int, limit: int, examples: List[str]):
+    if _private_cache_dir() is None:
+        return
+    # Write-then-rename so concurrent workers never read a partial file
+    tmp_path = f"{KSHOT_CACHE_PATH}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps({"mtime": mtime_ns, "limit": limit, "examples": examples}))
+        os.replace(tmp_path, KSHOT_CACHE_PATH)
+    except OSError:
+        pass
+
+
+def _parse_kshot_xml(limit: int) -> List[str]:
+    release = "<RELEASE>"
     examples = []
 
-    for mpu in root.findall(".//MPU"):
+    for _, el in ET.iterparse(KSHOT_XML_PATH, events=("end",), tag=("Version", "MPU")):
+        if el.tag == "Version":
+            # Only the document-level <Version> names the release
+            if el.getparent() is not None and el.getparent().getparent() is None:
+                release = el.text or release
+            continue
+
+        mpu = el
         mpu_name = mpu.attrib["name"]
         fqname = mpu.attrib.get("fqname", "<PROJECT>")
         project = fqname.split(".")[0]
@@ -142,6 +343,8 @@ def load_kshot_examples(limit: int = 6) -> List[str]:
             if len(examples) >= limit:
                 return examples
 
+        free_element(mpu)
+
     return examples
 
 
@@ -176,33 +379,128 @@ def rewrite_query_with_llm(
     return llm.chat("\n".join(prompt)).strip()
 
 
+# -------------------------------------------------------------------
+# REWRITE CACHE (REWRITTEN QUERY + VECTOR, SHARED KEY)
+# -------------------------------------------------------------------
+
+_REWRITE_CACHE = LRUTTLCache(max_size=2000, ttl_seconds=300)
+
+
+def _rewrite_key(user_query: str, project: Optional[str], version: Optional[str]) -> str:
+    mtime_ns = os.stat(KSHOT_XML_PATH).st_mtime_ns
+    return LRUTTLCache.make_key(user_query, project, version, EMBED_MODEL, mtime_ns)
+
+
+def rewrite_and_embed(
+    user_query: str,
+    project: Optional[str],
+    version: Optional[str],
+) -> Tuple[str, np.ndarray]:
+    """
+    Rewritten query and its vector; a repeat query skips both the LLM
+    and the embedder.
+    """
+    key = _rewrite_key(user_query, project, version)
+
+    entry = _REWRITE_CACHE.get(key)
+    if entry is None:
+        rewritten = rewrite_query_with_llm(user_query, load_kshot_examples())
+        entry = (rewritten, cached_embed(rewritten))
+        _REWRITE_CACHE.put(key, entry)
+
+    return entry
+
+
+async def rewrite_and_embed_async(
+    user_query: str,
+    project: Optional[str],
+    version: Optional[str],
+) -> Tuple[str, np.ndarray]:
+    key = _rewrite_key(user_query, project, version)
+
+    entry = _REWRITE_CACHE.get(key)
+    if entry is None:
+        kshots = load_kshot_examples()
+        rewritten = await asyncio.to_thread(rewrite_query_with_llm, user_query, kshots)
+        entry = (rewritten, await cached_embed_async(rewritten))
+        _REWRITE_CACHE.put(key, entry)
+
+    return entry
+
+
+def rewrite_and_embed_batch(
+    user_queries: List[str],
+    project: Optional[str],
+    version: Optional[str],
+) -> List[Tuple[str, np.ndarray]]:
+    keys = [_rewrite_key(q, project, version) for q in user_queries]
+    entries = [_REWRITE_CACHE.get(k) for k in keys]
+
+    misses = [i for i, e in enumerate(entries) if e is None]
+    if misses:
+        kshots = load_kshot_examples()
+        rewritten = [rewrite_query_with_llm(user_queries[i], kshots) for i in misses]
+        vectors = cached_embed_batch(rewritten)
+
+        for i, text, vec in zip(misses, rewritten, vectors):
+            entries[i] = (text, vec)
+            _REWRITE_CACHE.put(keys[i], entries[i])
+
+    return entries
+
+
 # -------------------------------------------------------------------
 # VECTOR SEARCH
 # -------------------------------------------------------------------
 
 def vector_search(query_vector: List[float]) -> List[Dict]:
-    client = get_weaviate()
-    col = client.collections.get(WEAVIATE_COLLECTION)
+    col = get_weaviate().collections.get(WEAVIATE_COLLECTION)
+    return _near_vector_hits(col, query_vector)
+
 
+def _near_vector_hits(col, query_vector) -> List[Dict]:
     res = col.query.near_vector(
         vector=query_vector,
         limit=TOP_K,
         return_metadata=MetadataQuery(distance=True),
     )
-
-    hits = [
+    return [
         {"vector_id": str(o.uuid), "distance": o.metadata.distance}
         for o in res.objects
     ]
 
-    client.close()
-    return hits
+
+def vector_search_batch(query_vectors: List[List[float]]) -> List[List[Dict]]:
+    """
+    Run several near_vector searches concurrently over the shared client
+    """
+    col = get_weaviate().collections.get(WEAVIATE_COLLECTION)
+
+    workers = max(1, min(SEARCH_BATCH_WORKERS, len(query_vectors)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda v: _near_vector_hits(col, v), query_vectors))
 
 
 # -------------------------------------------------------------------
 # SQL FETCH WITH OPTIONAL PROJECT / RELEASE FILTERS
 # -------------------------------------------------------------------
 
+CHUNK_FIELDS = (
+    "id",
+    "project",
+    "version",
+    "mpu_name",
+    "rg_index",
+    "profile",
+    "start_hex",
+    "end_hex",
+    "chunk_index",
+    "chunk_text",
+    "vector_id",
+)
+CHUNK_COLUMNS = ", ".join(CHUNK_FIELDS)
+
+
 def fetch_chunks(
     pg,
     vector_ids: List[str],
@@ -221,14 +519,111 @@ def fetch_chunks(
         params.append(version)
 
     sql = f"""
-    SELECT *
+    SELECT {CHUNK_COLUMNS}
     FROM policy_chunks
     WHERE {" AND ".join(clauses)}
     """
 
-    with pg.cursor(cursor_factory=RealDictCursor) as cur:
+    with pg.cursor() as cur:
         cur.execute(sql, params)
-        return cur.fetchall()
+        return [dict(zip(CHUNK_FIELDS, row)) for row in cur.fetchall()]
+
+
+async def fetch_chunks_async(
+    pool: asyncpg.Pool,
+    vector_ids: List[str],
+    project: Optional[str],
+    version: Optional[str],
+) -> List[asyncpg.Record]:
+    clauses = ["vector_id = ANY($1::text[])", "is_active = TRUE"]
+    params = [vector_ids]
+
+    if project:
+        params.append(project)
+        clauses.append(f"project = ${len(params)}")
+
+    if version:
+        params.append(version)
+        clauses.append(f"version = ${len(params)}")
+
+    sql = f"""
+    SELECT {CHUNK_COLUMNS}
+    FROM policy_chunks
+    WHERE {" AND ".join(clauses)}
+    """
+
+    async with pool.acquire() as conn:
+        return await conn.fetch(sql, *params)
+
+
+# -------------------------------------------------------------------
+# SCORE MERGE
+# -------------------------------------------------------------------
+
+def merge_scores(hits: List[Dict], chunks) -> List[Dict]:
+    """
+    Attach 1 / (1 + distance) to each chunk, vectorized over the hit list
+    """
+    if not chunks:
+        return []
+
+    scores = np.zeros(len(chunks), dtype=np.float32)
+
+    if hits:
+        hit_ids = np.array([h["vector_id"] for h in hits])
+        hit_scores = 1.0 / (1.0 + np.asarray([h["distance"] for h in hits], dtype=np.float32))
+
+        order = np.argsort(hit_ids)
+        sorted_ids = hit_ids[order]
+
+        chunk_ids = np.array([c["vector_id"] for c in chunks])
+        pos = np.minimum(np.searchsorted(sorted_ids, chunk_ids), len(sorted_ids) - 1)
+        found = sorted_ids[pos] == chunk_ids
+        scores[found] = hit_scores[order[pos[found]]]
+
+    return [
+        {**c, "semantic_score": float(score)}
+        for c, score in zip(chunks, scores)
+    ]
+
+
+# -------------------------------------------------------------------
+# CONFIDENCE GATE
+# -------------------------------------------------------------------
+
+def is_confident(hits: List[Dict]) -> bool:
+    return bool(hits) and hits[0]["distance"] < REWRITE_SKIP_DISTANCE
+
+
+def gated_vector_search(
+    user_query: str,
+    project: Optional[str],
+    version: Optional[str],
+) -> List[Dict]:
+    """
+    Search with the raw query first; only fall back to the k-shot LLM
+    rewrite when the top hit is not close enough.
+    """
+    hits = vector_search(cached_embed(user_query))
+    if is_confident(hits):
+        return hits
+
+    _, query_vector = rewrite_and_embed(user_query, project, version)
+    return vector_search(query_vector)
+
+
+async def gated_vector_search_async(
+    user_query: str,
+    project: Optional[str],
+    version: Optional[str],
+) -> List[Dict]:
+    raw_vector = await cached_embed_async(user_query)
+    hits = await asyncio.to_thread(vector_search, raw_vector)
+    if is_confident(hits):
+        return hits
+
+    _, query_vector = await rewrite_and_embed_async(user_query, project, version)
+    return await asyncio.to_thread(vector_search, query_vector)
 
 
 # -------------------------------------------------------------------
@@ -240,13 +635,7 @@ def run_kshot_rag(
     project: Optional[str] = None,
     version: Optional[str] = None,
 ):
-    kshots = load_kshot_examples()
-    rewritten = rewrite_query_with_llm(user_query, kshots)
-
-    embedder = get_embedder()
-    query_vector = embedder.embed_query(rewritten)
-
-    hits = vector_search(query_vector)
+    hits = gated_vector_search(user_query, project, version)
 
     pg = get_pg()
     chunks = fetch_chunks(
@@ -257,11 +646,49 @@ def run_kshot_rag(
     )
     pg.close()
 
-    score_map = {h["vector_id"]: 1 / (1 + h["distance"]) for h in hits}
+    return merge_scores(hits, chunks)
+
+
+async def run_kshot_rag_async(
+    user_query: str,
+    project: Optional[str] = None,
+    version: Optional[str] = None,
+):
+    pool = await get_pg_pool()
+
+    hits = await gated_vector_search_async(user_query, project, version)
+    chunks = await fetch_chunks_async(
+        pool,
+        [h["vector_id"] for h in hits],
+        project,
+        version,
+    )
+
+    return merge_scores(hits, chunks)
+
+
+def run_kshot_rag_batch(
+    user_queries: List[str],
+    project: Optional[str] = None,
+    version: Optional[str] = None,
+) -> List[List[Dict]]:
+    entries = rewrite_and_embed_batch(user_queries, project, version)
+    query_vectors = [vec for _, vec in entries]
+    batch_hits = vector_search_batch(query_vectors)
+
+    # One round-trip for every query's hits, then split back per query
+    all_ids = list({h["vector_id"] for hits in batch_hits for h in hits})
+    pg = get_pg()
+    rows = fetch_chunks(pg, all_ids, project, version)
+    pg.close()
+
+    by_vid = {}
+    for r in rows:
+        by_vid.setdefault(r["vector_id"], []).append(r)
 
     return [
-        {**c, "semantic_score": score_map.get(c["vector_id"], 0.0)}
-        for c in chunks
+        merge_scores(hits, [r for h in hits for r in by_vid.get(h["vector_id"], ())])
+        for hits in batch_hits
     ]
 
 
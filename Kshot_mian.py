@@ -1,6 +1,8 @@
 # app/main.py
 
 import logging
+import threading
+from typing import List
 
 from app.db.postgres import PostgresDriver
 from app.db.weaviate import WeaviateDriver
@@ -23,7 +25,43 @@ from app.api import create_app
 log = logging.getLogger(__name__)
 
 
-def build_rag_service() -> RAGService:
+# Domain-common queries used, with the k-shot examples, to prefill the
+# Weaviate HNSW cache at startup
+WARMUP_QUERIES: List[str] = [
+    "Which MPU regions use static policy and why?",
+    "What is the access range for this MPU region?",
+    "Which domains have read and write access to this region?",
+    "What is the security rationale for this policy region?",
+]
+
+
+def kshot_warmup_texts(kshot) -> List[str]:
+    """
+    The k-shot examples in the form they are searched with.
+    """
+    texts = []
+    for ex in kshot.examples:
+        text = ex.get("rewritten") or ex.get("query")
+        if text:
+            texts.append(text)
+    return texts
+
+
+def warmup_vector_cache(embedder, wv, queries: List[str]) -> None:
+    """
+    Throwaway searches so the first real queries don't hit a cold cache.
+    """
+    for q in queries:
+        try:
+            wv.semantic_search(embedder.embed(q), limit=1)
+        except Exception as e:
+            log.warning("Weaviate warmup query failed: %s", e)
+            return
+
+    log.info("Weaviate warmup done (%d queries)", len(queries))
+
+
+def build_rag_service(warmup_queries: List[str] = WARMUP_QUERIES) -> RAGService:
     """
     Composition root for RAG.
     This is the ONLY place objects are created and wired.
@@ -61,6 +99,14 @@ def build_rag_service() -> RAGService:
         min_confidence=0.6,
     )
 
+    # Fire-and-forget: startup is not blocked on the warmup searches
+    threading.Thread(
+        target=warmup_vector_cache,
+        args=(embedder, wv, kshot_warmup_texts(kshot) + list(warmup_queries)),
+        name="weaviate-warmup",
+        daemon=True,
+    ).start()
+
     prompt_builder = PromptBuilder()
 
     ranker = HybridRanker(
@@ -1,7 +1,30 @@
-from typing import List, Optional
+from functools import lru_cache
+from typing import List, Optional, Tuple
 from app.rag.models import Chunk
 
 
+SYSTEM_INSTRUCTIONS = (
+    "You are a hardware security and access-control policy expert.\n\n"
+    "Rules:\n"
+    "1. Answer ONLY using the provided policy context.\n"
+    "2. Do NOT invent MPU names, RG indices, address ranges, or profiles.\n"
+    "3. If the answer is not present in the context, say:\n"
+    "   \"The policy data does not specify this information.\"\n"
+    "4. Cite MPU name, RG index, profile, and address range explicitly.\n"
+    "5. Be precise and concise.\n"
+)
+
+
+@lru_cache(maxsize=32)
+def _examples_block_cached(examples: Tuple[str, ...]) -> str:
+    formatted = "\n\n".join(
+        f"Example {i+1}:\n{ex}"
+        for i, ex in enumerate(examples)
+    )
+
+    return f"Validated examples:\n{formatted}"
+
+
 class PromptBuilder:
     """
     Builds the final prompt sent to the LLM.
@@ -46,27 +69,14 @@ class PromptBuilder:
     # -------------------------
 
     def _system_instructions(self) -> str:
-        return (
-            "You are a hardware security and access-control policy expert.\n\n"
-            "Rules:\n"
-            "1. Answer ONLY using the provided policy context.\n"
-            "2. Do NOT invent MPU names, RG indices, address ranges, or profiles.\n"
-            "3. If the answer is not present in the context, say:\n"
-            "   \"The policy data does not specify this information.\"\n"
-            "4. Cite MPU name, RG index, profile, and address range explicitly.\n"
-            "5. Be precise and concise.\n"
-        )
+        return SYSTEM_INSTRUCTIONS
 
     def _examples_block(self, examples: Optional[List[str]]) -> Optional[str]:
         if not examples:
             return None
 
-        formatted = "\n\n".join(
-            f"Example {i+1}:\n{ex}"
-            for i, ex in enumerate(examples)
-        )
-
-        return f"Validated examples:\n{formatted}"
+        # k-shot lists are static per serving window; render once
+        return _examples_block_cached(tuple(examples))
 
     def _context_block(self, chunks: List[Chunk]) -> str:
         if not chunks:
@@ -75,24 +85,25 @@ class PromptBuilder:
                 "No policy chunks were retrieved for this query."
             )
 
-        rendered_chunks = []
+        # One flat list and a single join: no per-chunk strip()/concat copies
+        parts = ["Policy context:\n"]
         for c in chunks:
-            rendered_chunks.append(
-                f"""
-[Policy Chunk {c.chunk_id}]
-Project: {c.project}
-Version: {c.version}
-MPU: {c.mpu_name}
-RG Index: {c.rg_index}
-Profile: {c.profile}
-Address Range: {c.start_hex} - {c.end_hex}
-
-Policy Text:
-{c.chunk_text}
-""".strip()
+            parts.append(
+                f"[Policy Chunk {c.chunk_id}]\n"
+                f"Project: {c.project}\n"
+                f"Version: {c.version}\n"
+                f"MPU: {c.mpu_name}\n"
+                f"RG Index: {c.rg_index}\n"
+                f"Profile: {c.profile}\n"
+                f"Address Range: {c.start_hex} - {c.end_hex}\n"
+                "\n"
+                "Policy Text:\n"
             )
+            parts.append(c.chunk_text.rstrip())
+            parts.append("\n\n")
 
-        return "Policy context:\n" + "\n\n".join(rendered_chunks)
+        parts.pop()
+        return "".join(parts)
 
     def _query_block(
         self,
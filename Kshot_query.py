@@ -1,29 +1,39 @@
 from pathlib import Path
-import xml.etree.ElementTree as ET
+from lxml import etree as ET
+
+from embedding_cache import LRUTTLCache
 
 
 class KShotRewriter:
-    def __init__(self, llm, examples_path: str):
+    def __init__(self, llm, examples_path: str, cache_size: int = 2000, cache_ttl: int = 300):
         self.llm = llm
         self.examples = self._load_examples(examples_path)
+        self._cache = LRUTTLCache(max_size=cache_size, ttl_seconds=cache_ttl)
 
     def _load_examples(self, path: str) -> list[dict]:
-        tree = ET.parse(path)
-        root = tree.getroot()
-
         examples = []
-        for ex in root.findall("example"):
+        for _, ex in ET.iterparse(path, events=("end",), tag="example"):
             examples.append({
                 "query": ex.findtext("query"),
                 "project": ex.findtext("project"),
                 "version": ex.findtext("version"),
                 "rewritten": ex.findtext("rewritten"),
             })
+            ex.clear()
+            while ex.getprevious() is not None:
+                del ex.getparent()[0]
         return examples
 
     def rewrite(self, user_query: str, project: str | None, version: str | None) -> str:
-        prompt = self._build_prompt(user_query, project, version)
-        return self.llm.complete(prompt)
+        key = LRUTTLCache.make_key(user_query, project, version)
+
+        rewritten = self._cache.get(key)
+        if rewritten is None:
+            prompt = self._build_prompt(user_query, project, version)
+            rewritten = self.llm.complete(prompt)
+            self._cache.put(key, rewritten)
+
+        return rewritten
 
     def _build_prompt(self, user_query, project, version) -> str:
         ex_block = "\n".join(
@@ -12,12 +12,18 @@ Flow:
 
 from typing import List, Dict
 import os
+import hashlib
+from functools import lru_cache
+import atexit
+import threading
+import numpy as np
 import psycopg2
-from psycopg2.extras import RealDictCursor
 import weaviate
 from weaviate.classes.query import MetadataQuery
 from qgenie.integrations.langchain.embeddings import QGenieEmbeddings
 
+from embedding_cache import QueryEmbeddingCache
+
 
 # -------------------------------------------------------------------
 # CONFIG
@@ -36,44 +42,109 @@ POSTGRES_DSN = {
 
 K = 5  # top-k vectors
 KSHOT_DIR = "/data/kshot_examples"  # directory containing example txt files
+EMBED_MODEL = "text-embedding-3-large"
 
 
 # -------------------------------------------------------------------
 # CLIENTS
 # -------------------------------------------------------------------
 
+_WEAVIATE_CLIENT = None
+_WEAVIATE_LOCK = threading.Lock()
+
+
 def get_weaviate_client():
-    return weaviate.connect_to_local(
-        host="rag-weaviate",
-        port=8080
-    )
+    """
+    Process-wide Weaviate client (connected once, closed at exit)
+    """
+    global _WEAVIATE_CLIENT
+
+    if _WEAVIATE_CLIENT is None:
+        with _WEAVIATE_LOCK:
+            if _WEAVIATE_CLIENT is None:
+                _WEAVIATE_CLIENT = weaviate.connect_to_local(
+                    host="rag-weaviate",
+                    port=8080,
+                    skip_init_checks=True,
+                )
+                atexit.register(_WEAVIATE_CLIENT.close)
+
+    return _WEAVIATE_CLIENT
 
 
 def get_pg_conn():
     return psycopg2.connect(**POSTGRES_DSN)
 
 
+# Built once per process so the SDK HTTP session (and TLS) is reused
+@lru_cache(maxsize=1)
 def get_embedder():
     return QGenieEmbeddings(
-        model="text-embedding-3-large"
+        model=EMBED_MODEL
     )
 
 
+# -------------------------------------------------------------------
+# QUERY EMBEDDING CACHE
+# -------------------------------------------------------------------
+
+_QUERY_CACHE = QueryEmbeddingCache(max_size=2000, ttl_seconds=300)
+
+
+def kshot_signature() -> str:
+    """
+    Fingerprint of the k-shot example files.
+    The directory mtime catches adds/deletes/renames; per-file
+    (name, mtime, size) catches edits and copies with an older mtime.
+    """
+    files = []
+    with os.scandir(KSHOT_DIR) as it:
+        for entry in it:
+            st = entry.stat()
+            files.append((entry.name, st.st_mtime_ns, st.st_size))
+    files.sort()
+
+    state = (os.stat(KSHOT_DIR).st_mtime_ns, files)
+    return hashlib.blake2b(repr(state).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def cached_embed(text: str) -> np.ndarray:
+    key = QueryEmbeddingCache.make_key(text, EMBED_MODEL)
+
+    vector = _QUERY_CACHE.get(key)
+    if vector is None:
+        vector = np.asarray(get_embedder().embed_query(text), dtype=np.float32)
+        _QUERY_CACHE.put(key, vector)
+
+    return vector
+
+
 # -------------------------------------------------------------------
 # K-SHOT LOGIC
 # -------------------------------------------------------------------
 
+_KSHOT_CACHE = {"signature": None, "examples": None}
+
+
 def load_kshot_examples() -> List[str]:
     """
     Read example chunks from files.
     Each file = one example chunk_text
+    Cached until any example file changes on disk.
     """
+    signature = kshot_signature()
+    if _KSHOT_CACHE["examples"] is not None and _KSHOT_CACHE["signature"] == signature:
+        return _KSHOT_CACHE["examples"]
+
     examples = []
     for fname in sorted(os.listdir(KSHOT_DIR)):
         path = os.path.join(KSHOT_DIR, fname)
         if os.path.isfile(path):
             with open(path, "r", encoding="utf-8") as f:
                 examples.append(f.read().strip())
+
+    _KSHOT_CACHE["signature"] = signature
+    _KSHOT_CACHE["examples"] = examples
     return examples
 
 
@@ -81,20 +152,15 @@ def build_kshot_query(user_query: str, examples: List[str]) -> str:
     """
     Build a strong semantic query using examples
     """
-    prompt = [
+    return "\n".join([
         "You are searching security access control policies.",
         "Below are examples of relevant policy chunks:",
-        ""
-    ]
-
-    for i, ex in enumerate(examples, 1):
-        prompt.append(f"Example {i}:\n{ex}\n")
-
-    prompt.append("User question:")
-    prompt.append(user_query)
-    prompt.append("\nFind the most relevant policy chunks.")
-
-    return "\n".join(prompt)
+        "",
+        *[f"Example {i}:\n{ex}\n" for i, ex in enumerate(examples, 1)],
+        "User question:",
+        user_query,
+        "\nFind the most relevant policy chunks.",
+    ])
 
 
 # -------------------------------------------------------------------
@@ -118,69 +184,62 @@ def search_weaviate(query_vector: List[float], top_k: int) -> List[Dict]:
             "distance": obj.metadata.distance
         })
 
-    client.close()
     return hits
 
 
 # -------------------------------------------------------------------
-# POSTGRES FETCH
+# POSTGRES FETCH + SCORE MERGE
 # -------------------------------------------------------------------
 
-def fetch_chunks_by_vector_ids(pg_conn, vector_ids: List[str]) -> List[Dict]:
-    if not vector_ids:
+RANKED_CHUNK_FIELDS = (
+    "vector_id",
+    "chunk_text",
+    "mpu_name",
+    "rg_index",
+    "profile",
+    "project",
+    "version",
+    "semantic_score",
+    "rank",
+)
+
+
+def fetch_ranked_chunks(pg_conn, weaviate_hits: List[Dict]) -> List[Dict]:
+    """
+    Fetch payloads for Weaviate hits with the score merge done in SQL.
+    Distance → similarity and rank ordering are projected by Postgres.
+    """
+    if not weaviate_hits:
         return []
 
     sql = """
+    WITH q AS (
+        SELECT * FROM unnest(%s::text[], %s::float8[])
+            WITH ORDINALITY AS t(vid, dist, ord)
+    )
     SELECT
-        id,
-        project,
-        version,
-        mpu_name,
-        rg_index,
-        profile,
-        start_hex,
-        end_hex,
-        chunk_index,
-        chunk_text,
-        identity_hash,
-        content_hash,
-        vector_id,
-        created_at
-    FROM policy_chunks
-    WHERE vector_id = ANY(%s)
-      AND is_active = TRUE
-    """
-
-    with pg_conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(sql, (vector_ids,))
-        return cur.fetchall()
-
-
-# -------------------------------------------------------------------
-# SCORE MERGE
-# -------------------------------------------------------------------
-
-def merge_scores(weaviate_hits: List[Dict], pg_chunks: List[Dict]) -> List[Dict]:
+        p.vector_id,
+        p.chunk_text,
+        p.mpu_name,
+        p.rg_index,
+        p.profile,
+        p.project,
+        p.version,
+        1.0 / (1.0 + q.dist) AS semantic_score,
+        q.ord - 1 AS rank
+    FROM policy_chunks p
+    JOIN q ON p.vector_id = q.vid
+    WHERE p.is_active = TRUE
+    ORDER BY q.ord
     """
-    Convert distance → similarity score and merge
-    """
-    score_map = {
-        h["vector_id"]: 1 / (1 + h["distance"])
-        for h in weaviate_hits
-    }
-
-    order_map = {h["vector_id"]: i for i, h in enumerate(weaviate_hits)}
-
-    enriched = []
-    for chunk in pg_chunks:
-        enriched.append({
-            **chunk,
-            "semantic_score": score_map.get(chunk["vector_id"], 0.0),
-            "rank": order_map.get(chunk["vector_id"], 999)
-        })
 
-    enriched.sort(key=lambda c: c["rank"])
-    return enriched
+    # Plain tuple cursor; rows are zipped against the known projection
+    with pg_conn.cursor() as cur:
+        cur.execute(sql, (
+            [h["vector_id"] for h in weaviate_hits],
+            [h["distance"] for h in weaviate_hits],
+        ))
+        return [dict(zip(RANKED_CHUNK_FIELDS, row)) for row in cur.fetchall()]
 
 
 # -------------------------------------------------------------------
@@ -194,21 +253,18 @@ def run_kshot_rag(user_query: str) -> List[Dict]:
     # 2. Build K-shot query
     final_query = build_kshot_query(user_query, examples)
 
-    # 3. Embed query
-    embedder = get_embedder()
-    query_vector = embedder.embed_query(final_query)
+    # 3. Embed query (cached)
+    query_vector = cached_embed(final_query)
 
     # 4. Weaviate search
     weaviate_hits = search_weaviate(query_vector, K)
 
-    # 5. Fetch payloads from Postgres
-    vector_ids = [h["vector_id"] for h in weaviate_hits]
+    # 5 + 6. Fetch payloads from Postgres, scored and ranked in SQL
     pg_conn = get_pg_conn()
-    chunks = fetch_chunks_by_vector_ids(pg_conn, vector_ids)
+    chunks = fetch_ranked_chunks(pg_conn, weaviate_hits)
     pg_conn.close()
 
-    # 6. Merge scores
-    return merge_scores(weaviate_hits, chunks)
+    return chunks
 
 
 # -------------------------------------------------------------------
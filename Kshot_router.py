@@ -1,3 +1,6 @@
+import asyncio
+
+
 class RAGRouter:
     def __init__(self, pg, weaviate, embedder, kshot):
         self.pg = pg
@@ -8,14 +11,42 @@ class RAGRouter:
         self.structured = StructuredSearcher(pg)
         self.semantic = SemanticSearcher(weaviate, embedder)
 
-    def retrieve_chunks(self, query: str, filters: dict):
-        rewritten = self.kshot.rewrite(
+    async def retrieve_chunks(self, query: str, filters: dict):
+        rewritten = await asyncio.to_thread(
+            self.kshot.rewrite,
             query,
             filters.get("project"),
             filters.get("version"),
         )
 
-        structured_chunks = self.structured.search(filters)
-        semantic_chunks = self.semantic.search(rewritten)
+        # Postgres and Weaviate are independent: wait for max(), not sum()
+        structured_chunks, semantic_chunks = await asyncio.gather(
+            asyncio.to_thread(self.structured.search, filters),
+            asyncio.to_thread(self.semantic.search, rewritten),
+        )
+
+        return ChunkMerger.merge(structured_chunks, semantic_chunks)
+
+    async def retrieve_chunks_batch(self, queries: list, filters_list: list):
+        rewritten = await asyncio.gather(*(
+            asyncio.to_thread(
+                self.kshot.rewrite,
+                query,
+                filters.get("project"),
+                filters.get("version"),
+            )
+            for query, filters in zip(queries, filters_list)
+        ))
+
+        structured_batches, semantic_batches = await asyncio.gather(
+            asyncio.gather(*(
+                asyncio.to_thread(self.structured.search, filters)
+                for filters in filters_list
+            )),
+            asyncio.to_thread(self.semantic.search_batch, list(rewritten)),
+        )
 
-        return ChunkMerger.merge(structured_chunks, semantic_chunks)
\ No newline at end of file
+        return [
+            ChunkMerger.merge(structured_chunks, semantic_chunks)
+            for structured_chunks, semantic_chunks in zip(structured_batches, semantic_batches)
+        ]
@@ -1,75 +1,76 @@
-from pypika import Query, Table, functions as fn
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Tuple
 from queryfacts import QueryFacts
 
 
-XML = Table("xml_chunks")
-PROJECTS = Table("project_versions")
+CATALOG_SELECT = "SELECT project, version FROM project_versions"
+CATALOG_COUNT = "SELECT COUNT(*) FROM project_versions"
 
+XML_SELECT = "SELECT * FROM xml_chunks"
+XML_COUNT = "SELECT COUNT(*) FROM xml_chunks"
 
-class SQLQueryBuilder:
-    """
-    Builds SQL from QueryFacts.
-    No routing, no intent detection, no DB calls.
-    """
+# Filter field -> predicate, in the order they appear in the WHERE clause
+CATALOG_FILTERS = (
+    ("project", "project = %(project)s"),
+    ("version", "version = %(version)s"),
+)
 
-    def build(self, facts: QueryFacts) -> str:
-        if facts.intent == "CATALOG":
-            return self._build_catalog(facts)
-
-        if facts.intent in ("LOOKUP", "POLICY", "REGION"):
-            return self._build_xml_lookup(facts)
-
-        raise ValueError(f"Unsupported intent: {facts.intent}")
-
-    # -------------------------
-    # CATALOG
-    # -------------------------
-    def _build_catalog(self, facts: QueryFacts) -> str:
-        q = Query.from_(PROJECTS)
-
-        if facts.operation == "COUNT":
-            q = q.select(fn.Count("*"))
-        else:
-            q = q.select(
-                PROJECTS.project,
-                PROJECTS.version
-            )
+XML_FILTERS = (
+    ("project", "project = %(project)s"),
+    ("version", "version = %(version)s"),
+    ("mpu_name", "mpu_name = %(mpu_name)s"),
+    ("profile", "profile = %(profile)s"),
+    ("addr_start", "addr_start >= %(addr_start)s"),
+    ("addr_end", "addr_end <= %(addr_end)s"),
+)
 
-        if facts.project:
-            q = q.where(PROJECTS.project == facts.project)
+XML_INTENTS = ("LOOKUP", "POLICY", "REGION")
 
-        if facts.version:
-            q = q.where(PROJECTS.version == facts.version)
 
-        return q.get_sql()
+def _with_where(base: str, where: list) -> str:
+    return base + (" WHERE " + " AND ".join(where) if where else "")
 
-    # -------------------------
-    # XML / POLICY / REGION
-    # -------------------------
-    def _build_xml_lookup(self, facts: QueryFacts) -> str:
-        q = Query.from_(XML)
 
-        if facts.operation == "COUNT":
-            q = q.select(fn.Count("*"))
-        else:
-            q = q.select("*")
+@lru_cache(maxsize=256)
+def _sql_template(intent: str, operation: str, fields: FrozenSet[str]) -> str:
+    """
+    Parameterized SQL for one query shape.
+    Only (intent, operation, present filter fields) decide the text.
+    """
+    if intent == "CATALOG":
+        base = CATALOG_COUNT if operation == "COUNT" else CATALOG_SELECT
+        filters = CATALOG_FILTERS
+    elif intent in XML_INTENTS:
+        base = XML_COUNT if operation == "COUNT" else XML_SELECT
+        filters = XML_FILTERS
+    else:
+        raise ValueError(f"Unsupported intent: {intent}")
 
-        if facts.project:
-            q = q.where(XML.project == facts.project)
+    return _with_where(base, [pred for name, pred in filters if name in fields])
 
-        if facts.version:
-            q = q.where(XML.version == facts.version)
 
-        if facts.mpu_name:
-            q = q.where(XML.mpu_name == facts.mpu_name)
+class SQLQueryBuilder:
+    """
+    Builds SQL from QueryFacts.
+    No routing, no intent detection, no DB calls.
 
-        if facts.profile:
-            q = q.where(XML.profile == facts.profile)
+    Returns (sql, params) with %(name)s placeholders so the
+    driver handles escaping.
+    """
 
-        if facts.addr_start is not None:
-            q = q.where(XML.addr_start >= facts.addr_start)
+    def build(self, facts: QueryFacts) -> Tuple[str, Dict[str, Any]]:
+        if facts.intent == "CATALOG":
+            filters = CATALOG_FILTERS
+        elif facts.intent in XML_INTENTS:
+            filters = XML_FILTERS
+        else:
+            raise ValueError(f"Unsupported intent: {facts.intent}")
 
-        if facts.addr_end is not None:
-            q = q.where(XML.addr_end <= facts.addr_end)
+        params = {}
+        for name, _ in filters:
+            value = getattr(facts, name, None)
+            if value is not None and value != "":
+                params[name] = value
 
-        return q.get_sql()
\ No newline at end of file
+        sql = _sql_template(facts.intent, facts.operation, frozenset(params))
+        return sql, params
@@ -1,6 +1,10 @@
 # app/api.py
 
-from fastapi import FastAPI
+import asyncio
+import contextlib
+import time
+
+from fastapi import FastAPI, Request, Response
 from contextlib import asynccontextmanager
 
 from app.db.postgres import PostgresDriver
@@ -11,6 +15,65 @@ from app.rag.router import RAGRouter
 from app.rag.service import RAGService
 from app.rag.context_resolver import ContextResolver
 from app.rag.prompt_builder import PromptBuilder
+from app.rag.response_cache import init_response_cache, response_cache_key, cached_response
+
+
+# ------------------------
+# Query micro-batching
+# ------------------------
+
+MAX_BATCH = 32
+BATCH_WINDOW_MS = 5
+
+
+def _fail_pending(batch, exc: BaseException):
+    for _, future in batch:
+        if not future.done():
+            future.set_exception(exc)
+
+
+def _shutdown_error() -> RuntimeError:
+    return RuntimeError("Query service is shutting down")
+
+
+async def _batch_worker(rag: RAGService, queue: asyncio.Queue):
+    """
+    Drain up to MAX_BATCH queries (or whatever arrives within
+    BATCH_WINDOW_MS) and answer them with one rag.answer_batch call.
+    """
+    while True:
+        batch = [await queue.get()]
+        deadline = time.monotonic() + BATCH_WINDOW_MS / 1000
+
+        try:
+            while len(batch) < MAX_BATCH:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            queries = [query for query, _ in batch]
+            results = await rag.answer_batch(queries)
+        except asyncio.CancelledError:
+            # Shutdown: the batch in hand must not leave its callers waiting
+            _fail_pending(batch, _shutdown_error())
+            raise
+        except Exception as e:
+            _fail_pending(batch, e)
+            continue
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+async def _submit(queue: asyncio.Queue, query: str) -> dict:
+    future = asyncio.get_running_loop().create_future()
+    await queue.put((query, future))
+    return await future
 
 
 # ------------------------
@@ -26,6 +89,9 @@ async def lifespan(app: FastAPI):
     # ---- Ensure schema ONCE ----
     ensure_schema(wv.client)
 
+    # ---- Response cache (Redis) ----
+    redis = init_response_cache()
+
     # ---- RAG wiring ----
     router = RAGRouter(pg, wv)
     context_resolver = ContextResolver()
@@ -37,10 +103,24 @@ async def lifespan(app: FastAPI):
         prompt_builder=prompt_builder,
     )
 
+    app.state.queries = asyncio.Queue()
+    batcher = asyncio.create_task(_batch_worker(app.state.rag, app.state.queries))
+
     yield
 
+    batcher.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await batcher
+
+    # Queries still queued would otherwise never be answered
+    queue = app.state.queries
+    while not queue.empty():
+        _fail_pending([queue.get_nowait()], _shutdown_error())
+
     # ---- Cleanup (optional) ----
     wv.client.close()
+    pg.close()
+    await redis.close()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -51,7 +131,7 @@ app = FastAPI(lifespan=lifespan)
 # ------------------------
 
 @app.post("/query")
-async def query(payload: dict):
+async def query(payload: dict, request: Request, response: Response):
     """
     payload = { "query": "<user text>" }
     """
@@ -63,10 +143,11 @@ async def query(payload: dict):
             "needs_context": False,
         }
 
-    rag = app.state.rag
-    result = await rag.answer(user_query)
+    key = response_cache_key(user_query)
 
-    return result
+    return await cached_response(
+        request, response, key, lambda: _submit(app.state.queries, user_query)
+    )
 
 
 @app.get("/health")
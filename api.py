@@ -1,11 +1,25 @@
 # api.py
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response
 from pydantic import BaseModel
 from router import RAGRouter
 from rag.prompt_builder import build_prompt
+from response_cache import init_response_cache, response_cache_key, cached_response
 
-app = FastAPI()
-router = RAGRouter()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    redis = init_response_cache()
+
+    # Built once per worker before the first request, not at import
+    app.state.router = RAGRouter()
+
+    yield
+
+    await redis.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 class QueryRequest(BaseModel):
@@ -17,24 +31,30 @@ class QueryRequest(BaseModel):
 
 
 @app.post("/rag/query")
-async def rag_query(req: QueryRequest):
+async def rag_query(req: QueryRequest, request: Request, response: Response):
     filters = {
         "project": req.project,
         "mpu": req.mpu,
         "profile": req.profile,
     }
 
-    qtype, context = router.route(req.query, filters)
+    router = request.app.state.router
 
-    prompt = build_prompt(
-        user_query=req.query,
-        context_chunks=context,
-        project=req.project,
-        version=req.version,
-    )
+    async def build():
+        qtype, context = router.route(req.query, filters)
 
-    return {
-        "query_type": qtype,
-        "context_chunks": len(context),
-        "prompt": prompt,
-    }
+        prompt = build_prompt(
+            user_query=req.query,
+            context_chunks=context,
+            project=req.project,
+            version=req.version,
+        )
+
+        return {
+            "query_type": qtype,
+            "context_chunks": len(context),
+            "prompt": prompt,
+        }
+
+    key = response_cache_key(req.query, {**filters, "version": req.version})
+    return await cached_response(request, response, key, build)
@@ -1,37 +1,20 @@
-def _build_llm_context(
-    self,
-    user_query: str,
-    hyde_text: str,
-    execution_result: Dict,
-    facts: QueryFacts,
-) -> str:
-    rows = execution_result.get("rows", [])
-    entity = facts.entity
-
-    renderer = RENDERERS.get(entity)
-    if not renderer:
-        raise ValueError(f"No renderer registered for entity {entity}")
-
-    header = renderer.header(rows)
-    body = renderer.render_rows(rows)
-    explanation = renderer.explain()
-
-    context = f"""
+# Fixed skeleton of the structured-answer context, filled per call
+_CTX_TEMPLATE = """
 You are answering a structured database query.
 
 User question:
 {user_query}
 
 Query intent:
-- Intent: {facts.intent.name}
-- Operation: {facts.operation.name}
-- Entity: {facts.entity.name}
+- Intent: {intent}
+- Operation: {operation}
+- Entity: {entity}
 
 Database result summary:
 {header}
 
 Sample records:
-{body if body else "(no records)"}
+{body}
 
 Guidelines:
 - Do NOT list all records.
@@ -41,6 +24,38 @@ Guidelines:
 
 Explainability:
 {explanation}
-"""
+""".strip()
+
+
+def _build_llm_context(
+    self,
+    user_query: str,
+    hyde_text: str,
+    execution_result: Dict,
+    facts: QueryFacts,
+) -> str:
+    rows = execution_result.get("rows", [])
+    entity = facts.entity
+
+    renderer = RENDERERS.get(entity)
+    if not renderer:
+        raise ValueError(f"No renderer registered for entity {entity}")
+
+    header = renderer.header(rows)
+    body = renderer.render_rows(rows)
+    explanation = renderer.explain()
 
-    return context.strip()
\ No newline at end of file
+    # Enum .name is a descriptor call: read each once
+    intent_name = facts.intent.name
+    operation_name = facts.operation.name
+    entity_name = entity.name
+
+    return _CTX_TEMPLATE.format(
+        user_query=user_query,
+        intent=intent_name,
+        operation=operation_name,
+        entity=entity_name,
+        header=header,
+        body=body if body else "(no records)",
+        explanation=explanation,
+    ).rstrip()
@@ -1,30 +1,20 @@
 import chainlit as cl
-import requests
+import httpx
 import json
-from sseclient import SSEClient
+from collections import deque
 
 RAG_URL = "http://rag-query:3000/v1/chat/completions"
 MODEL = "tag-service"
 
 MAX_HISTORY = 10  # keep last N messages only
 
-
-def build_messages(history):
-    """
-    Convert stored history into OpenAI-style messages
-    """
-    messages = []
-    for h in history:
-        messages.append({
-            "role": h["role"],
-            "content": h["content"]
-        })
-    return messages
+# Shared across sessions: keeps the connection pool warm
+_client = httpx.AsyncClient(timeout=120)
 
 
 @cl.on_chat_start
 async def on_chat_start():
-    cl.user_session.set("history", [])
+    cl.user_session.set("history", deque(maxlen=MAX_HISTORY))
     await cl.Message(
         content="🧠 RAG assistant ready. Ask anything."
     ).send()
@@ -32,15 +22,18 @@ async def on_chat_start():
 
 @cl.on_message
 async def on_message(message: cl.Message):
-    history = cl.user_session.get("history", [])
+    history = cl.user_session.get("history")
+    if history is None:
+        # Stored by reference: this is the only set for the session
+        history = deque(maxlen=MAX_HISTORY)
+        cl.user_session.set("history", history)
 
-    # Add user message to memory
+    # Add user message to memory (deque drops the oldest past MAX_HISTORY)
     history.append({"role": "user", "content": message.content})
-    history = history[-MAX_HISTORY:]
 
     payload = {
         "model": MODEL,
-        "messages": build_messages(history),
+        "messages": list(history),
         "stream": True
     }
 
@@ -50,22 +43,23 @@ async def on_message(message: cl.Message):
     assistant_reply = ""
 
     try:
-        with requests.post(
+        async with _client.stream(
+            "POST",
             RAG_URL,
             json=payload,
             headers={"Content-Type": "application/json"},
-            stream=True,
-            timeout=120,
         ) as response:
             response.raise_for_status()
 
-            client = SSEClient(response)
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
 
-            for event in client.events():
-                if event.data == "[DONE]":
+                event_data = line[5:].strip()
+                if event_data == "[DONE]":
                     break
 
-                data = json.loads(event.data)
+                data = json.loads(event_data)
 
                 delta = (
                     data.get("choices", [{}])[0]
@@ -84,7 +78,5 @@ async def on_message(message: cl.Message):
 
     # Save assistant reply to memory
     history.append({"role": "assistant", "content": assistant_reply})
-    history = history[-MAX_HISTORY:]
-    cl.user_session.set("history", history)
 
     await msg.update()
\ No newline at end of file
@@ -1,19 +1,15 @@
+from itertools import chain
 from typing import List
 from app.rag.models import Chunk
 
 class ChunkMerger:
     @staticmethod
     def merge(structured: List[Chunk], semantic: List[Chunk]) -> List[Chunk]:
-        seen = set()
-        merged: List[Chunk] = []
+        # dicts keep insertion order: first chunk per key wins, one hash each
+        merged = {}
 
-        for chunk in structured + semantic:
+        for chunk in chain(structured, semantic):
             key = (chunk.project, chunk.mpu_name, chunk.rg_index, chunk.profile)
+            merged.setdefault(key, chunk)
 
-            if key in seen:
-                continue
-
-            seen.add(key)
-            merged.append(chunk)
-
-        return merged
\ No newline at end of file
+        return list(merged.values())
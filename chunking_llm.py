@@ -3,17 +3,22 @@ Production-grade LLM-based XML Chunking System
 Supports multiple chunking strategies with validation and error handling
 “””
 
-import xml.etree.ElementTree as ET
+from lxml import etree
 from typing import List, Dict, Optional, Tuple, Any
 from dataclasses import dataclass, asdict
 from enum import Enum
 import json
 import logging
+import os
+import threading
 from pathlib import Path
 import hashlib
-import re
 from abc import ABC, abstractmethod
+import asyncio
+import inspect
+from functools import lru_cache
 import anthropic
+import orjson
 import tiktoken
 
 # Configure logging
@@ -24,6 +29,13 @@ format=’%(asctime)s - %(name)s - %(levelname)s - %(message)s’
 )
 logger = logging.getLogger(**name**)
 
+# Shared encoder: load the BPE ranks once per process, not per TokenCounter
+try:
+    _ENC = tiktoken.get_encoding("cl100k_base")
+except Exception as e:
+    logger.warning(f"Failed to load tiktoken encoding: {e}. Using character approximation.")
+    _ENC = None
+
 class ChunkingStrategy(Enum):
 “”“Supported chunking strategies”””
 SEMANTIC = “semantic”
@@ -31,7 +43,7 @@ HIERARCHICAL = “hierarchical”
 ADAPTIVE = “adaptive”
 TAG_PRIORITY = “tag_priority”
 
-@dataclass
+@dataclass(slots=True)
 class ChunkMetadata:
 “”“Metadata for each chunk”””
 chunk_id: str
@@ -43,7 +55,7 @@ sequence_number: int
 total_chunks: Optional[int] = None
 source_file: Optional[str] = None
 
-@dataclass
+@dataclass(slots=True)
 class Chunk:
 “”“Represents a single chunk of XML content”””
 id: str
@@ -66,6 +78,9 @@ class TokenCounter:
 ```
 def __init__(self, model: str = "cl100k_base"):
     """Initialize token counter with encoding model"""
+    if model == "cl100k_base":
+        self.encoding = _ENC
+        return
     try:
         self.encoding = tiktoken.get_encoding(model)
     except Exception as e:
@@ -79,19 +94,38 @@ def count(self, text: str) -> int:
     else:
         # Approximate: 1 token ≈ 4 characters
         return len(text) // 4
+
+def count_batch(self, texts: List[str]) -> List[int]:
+    """Count tokens for many texts in one encode_batch call"""
+    if self.encoding:
+        encoded = self.encoding.encode_batch(texts, num_threads=os.cpu_count() or 1)
+        return [len(tokens) for tokens in encoded]
+    else:
+        return [len(text) // 4 for text in texts]
 ```
 
 class XMLValidator:
 “”“Validates XML content”””
 
 ```
+_local = threading.local()
+
+@staticmethod
+def _parser() -> etree.XMLParser:
+    """One libxml2 parser per thread, reused across validations"""
+    parser = getattr(XMLValidator._local, "parser", None)
+    if parser is None:
+        parser = etree.XMLParser(collect_ids=False, resolve_entities=False, no_network=True)
+        XMLValidator._local.parser = parser
+    return parser
+
 @staticmethod
 def is_well_formed(xml_string: str) -> Tuple[bool, Optional[str]]:
     """Check if XML string is well-formed"""
     try:
-        ET.fromstring(xml_string)
+        etree.fromstring(xml_string.encode(), XMLValidator._parser())
         return True, None
-    except ET.ParseError as e:
+    except etree.XMLSyntaxError as e:
         return False, str(e)
 
 @staticmethod
@@ -103,19 +137,10 @@ def validate_chunk(chunk_content: str) -> bool:
     return is_valid
 ```
 
-class PromptBuilder:
-“”“Builds prompts for different chunking strategies”””
+# Prompt templates: placeholders are filled with str.format_map, so
+# literal JSON braces stay doubled
 
-```
-@staticmethod
-def build_semantic_prompt(
-    xml_content: str,
-    target_size: int,
-    atomic_tags: List[str]
-) -> str:
-    """Build prompt for semantic chunking"""
-    return f"""You are an XML document analyzer. Your task is to identify optimal chunk boundaries in XML documents while preserving semantic coherence.
-```
+_SEMANTIC_TEMPLATE = """You are an XML document analyzer. Your task is to identify optimal chunk boundaries in XML documents while preserving semantic coherence.
 
 Given this XML content:
 <xml_content>
@@ -129,7 +154,7 @@ Instructions:
 1. Preserve complete XML tags (no broken tags)
 1. Keep related content together (e.g., a section with all its subsections)
 1. Target chunk size: approximately {target_size} tokens
-1. Never split these atomic tags: {’, ’.join(atomic_tags)}
+1. Never split these atomic tags: {atomic_tags}
 
 Return your analysis as a JSON array with this exact structure:
 [
@@ -150,17 +175,9 @@ IMPORTANT:
 - Return ONLY the JSON array, no additional text
 - Ensure all chunks are valid, well-formed XML
 - Maintain document order
-  “””
-  
-  @staticmethod
-  def build_hierarchical_prompt(
-  xml_content: str,
-  min_size: int,
-  max_size: int,
-  preferred_tags: List[str]
-  ) -> str:
-  “”“Build prompt for hierarchical chunking”””
-  return f””“Analyze this XML document and create chunks based on hierarchical structure:
+"""
+
+_HIERARCHICAL_TEMPLATE = """Analyze this XML document and create chunks based on hierarchical structure:
 
 <xml_document>
 {xml_content}
@@ -169,7 +186,7 @@ IMPORTANT:
 Chunking Requirements:
 
 1. Identify the document’s hierarchical structure
-1. Prefer splitting at these tags (in order): {’, ’.join(preferred_tags)}
+1. Prefer splitting at these tags (in order): {preferred_tags}
 1. Chunk size range: {min_size} to {max_size} tokens
 1. Include parent context in metadata
 1. Ensure each chunk is semantically complete
@@ -189,19 +206,9 @@ Return a JSON array with this structure:
 ]
 
 Return ONLY the JSON array, no other text.
-“””
+"""
 
-```
-@staticmethod
-def build_adaptive_prompt(
-    xml_content: str,
-    min_size: int,
-    max_size: int,
-    atomic_tags: List[str]
-) -> str:
-    """Build prompt for adaptive chunking"""
-    return f"""Intelligently chunk this XML based on content density and structure:
-```
+_ADAPTIVE_TEMPLATE = """Intelligently chunk this XML based on content density and structure:
 
 <xml>
 {xml_content}
@@ -212,7 +219,7 @@ Adaptive Strategy:
 1. Analyze content density (text vs markup ratio)
 1. For text-heavy sections: chunk by size ({min_size}-{max_size} tokens)
 1. For structure-heavy sections: chunk by logical XML elements
-1. Always preserve complete: {’, ’.join(atomic_tags)}
+1. Always preserve complete: {atomic_tags}
 1. Maintain semantic boundaries
 
 Return a JSON array:
@@ -230,7 +237,66 @@ Return a JSON array:
 ]
 
 Return ONLY the JSON array.
-“””
+"""
+
+@lru_cache(maxsize=32)
+def _join_tags(tags: Tuple[str, ...]) -> str:
+    return ", ".join(tags)
+
+@lru_cache(maxsize=32)
+def _prompt_frame(template: str, fields: Tuple[Tuple[str, Any], ...]) -> Tuple[str, str]:
+    """Render everything around {xml_content} once per config"""
+    head, tail = template.split("{xml_content}")
+    values = dict(fields)
+    return head.format_map(values), tail.format_map(values)
+
+class PromptBuilder:
+“”“Builds prompts for different chunking strategies”””
+
+```
+@staticmethod
+def build_semantic_prompt(
+    xml_content: str,
+    target_size: int,
+    atomic_tags: List[str]
+) -> str:
+    """Build prompt for semantic chunking"""
+    head, tail = _prompt_frame(_SEMANTIC_TEMPLATE, (
+        ("target_size", target_size),
+        ("atomic_tags", _join_tags(tuple(atomic_tags))),
+    ))
+    return head + xml_content + tail
+
+@staticmethod
+def build_hierarchical_prompt(
+    xml_content: str,
+    min_size: int,
+    max_size: int,
+    preferred_tags: List[str]
+) -> str:
+    """Build prompt for hierarchical chunking"""
+    head, tail = _prompt_frame(_HIERARCHICAL_TEMPLATE, (
+        ("min_size", min_size),
+        ("max_size", max_size),
+        ("preferred_tags", _join_tags(tuple(preferred_tags))),
+    ))
+    return head + xml_content + tail
+
+@staticmethod
+def build_adaptive_prompt(
+    xml_content: str,
+    min_size: int,
+    max_size: int,
+    atomic_tags: List[str]
+) -> str:
+    """Build prompt for adaptive chunking"""
+    head, tail = _prompt_frame(_ADAPTIVE_TEMPLATE, (
+        ("min_size", min_size),
+        ("max_size", max_size),
+        ("atomic_tags", _join_tags(tuple(atomic_tags))),
+    ))
+    return head + xml_content + tail
+```
 
 class LLMClient(ABC):
 “”“Abstract base class for LLM clients”””
@@ -265,6 +331,29 @@ def generate(self, prompt: str, max_tokens: int = 4096) -> str:
         raise
 ```
 
+class AnthropicAsyncClient(LLMClient):
+“”“Async Anthropic Claude client for concurrent chunking”””
+
+```
+def __init__(self, api_key: str, model: str = "claude-sonnet-4-20250514"):
+    """Initialize async Anthropic client"""
+    self.client = anthropic.AsyncAnthropic(api_key=api_key)
+    self.model = model
+
+async def generate(self, prompt: str, max_tokens: int = 4096) -> str:
+    """Generate response using Claude without blocking the event loop"""
+    try:
+        response = await self.client.messages.create(
+            model=self.model,
+            max_tokens=max_tokens,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        return response.content[0].text
+    except Exception as e:
+        logger.error(f"LLM generation failed: {e}")
+        raise
+```
+
 class XMLChunker:
 “”“Main XML chunking orchestrator”””
 
@@ -308,6 +397,25 @@ def chunk_xml(
     """
     Chunk XML content using specified strategy
     
+    Sync wrapper around chunk_xml_async for CLI use.
+    
+    Args:
+        xml_content: XML content as string
+        source_file: Optional source file path for metadata
+        
+    Returns:
+        List of Chunk objects
+    """
+    return asyncio.run(self.chunk_xml_async(xml_content, source_file))
+
+async def chunk_xml_async(
+    self,
+    xml_content: str,
+    source_file: Optional[str] = None
+) -> List[Chunk]:
+    """
+    Chunk XML content using specified strategy
+    
     Args:
         xml_content: XML content as string
         source_file: Optional source file path for metadata
@@ -327,7 +435,7 @@ def chunk_xml(
     
     # Generate chunks using LLM
     logger.info("Requesting LLM to generate chunks...")
-    response = self.llm_client.generate(prompt)
+    response = await self._generate(prompt)
     
     # Parse and validate response
     chunks = self._parse_llm_response(response, source_file)
@@ -341,6 +449,29 @@ def chunk_xml(
     logger.info(f"Successfully created {len(chunks)} chunks")
     return chunks
 
+async def chunk_many(
+    self,
+    docs: List[Tuple[str, Optional[str]]]
+) -> List[List[Chunk]]:
+    """
+    Chunk several documents concurrently
+    
+    Args:
+        docs: (xml_content, source_file) pairs
+        
+    Returns:
+        One list of Chunk objects per document, in input order
+    """
+    return await asyncio.gather(
+        *(self.chunk_xml_async(xml_content, source_file) for xml_content, source_file in docs)
+    )
+
+async def _generate(self, prompt: str) -> str:
+    """Await async clients; run sync clients in a worker thread"""
+    if inspect.iscoroutinefunction(self.llm_client.generate):
+        return await self.llm_client.generate(prompt)
+    return await asyncio.to_thread(self.llm_client.generate, prompt)
+
 def _build_prompt(self, xml_content: str) -> str:
     """Build prompt based on chunking strategy"""
     target_size = (self.min_chunk_size + self.max_chunk_size) // 2
@@ -370,24 +501,23 @@ def _parse_llm_response(
     """Parse LLM response into Chunk objects"""
     try:
         # Extract JSON from response (handle potential markdown code blocks)
-        json_match = re.search(r'\[[\s\S]*\]', response)
-        if json_match:
-            json_str = json_match.group(0)
-        else:
-            json_str = response
+        start = response.find('[')
+        end = response.rfind(']')
+        json_str = response[start:end + 1] if start != -1 and end > start else response
         
-        chunks_data = json.loads(json_str)
+        chunks_data = orjson.loads(json_str)
+        
+        # Count tokens for every chunk in one batch
+        contents = [chunk_data['content'] for chunk_data in chunks_data]
+        token_counts = self.token_counter.count_batch(contents)
         
         chunks = []
-        for idx, chunk_data in enumerate(chunks_data):
+        for idx, (chunk_data, token_count) in enumerate(zip(chunks_data, token_counts)):
             # Generate unique chunk ID
             chunk_id = chunk_data.get('chunk_id') or self._generate_chunk_id(
                 chunk_data['content'], idx
             )
             
-            # Count tokens
-            token_count = self.token_counter.count(chunk_data['content'])
-            
             # Create metadata
             metadata = ChunkMetadata(
                 chunk_id=chunk_id,
@@ -444,8 +574,9 @@ def _finalize_chunks(self, chunks: List[Chunk]) -> List[Chunk]:
 @staticmethod
 def _generate_chunk_id(content: str, index: int) -> str:
     """Generate unique chunk ID"""
-    hash_obj = hashlib.md5(content.encode())
-    return f"chunk_{index:04d}_{hash_obj.hexdigest()[:8]}"
+    # 4-byte digest is exactly the 8 hex chars we keep
+    hash_obj = hashlib.blake2b(content.encode(), digest_size=4)
+    return f"chunk_{index:04d}_{hash_obj.hexdigest()}"
 ```
 
 class ChunkExporter:
@@ -456,16 +587,18 @@ class ChunkExporter:
 def to_json(chunks: List[Chunk], output_path: Path) -> None:
     """Export chunks to JSON file"""
     data = [chunk.to_dict() for chunk in chunks]
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    with open(output_path, 'wb') as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
     logger.info(f"Exported {len(chunks)} chunks to {output_path}")
 
 @staticmethod
 def to_jsonl(chunks: List[Chunk], output_path: Path) -> None:
     """Export chunks to JSONL file (one chunk per line)"""
-    with open(output_path, 'w', encoding='utf-8') as f:
-        for chunk in chunks:
-            f.write(json.dumps(chunk.to_dict(), ensure_ascii=False) + '\n')
+    with open(output_path, 'wb') as f:
+        f.writelines(
+            orjson.dumps(chunk.to_dict(), option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS)
+            for chunk in chunks
+        )
     logger.info(f"Exported {len(chunks)} chunks to {output_path}")
 
 @staticmethod
@@ -1,7 +1,29 @@
 # rag/classifier.py
 from enum import Enum
+from functools import lru_cache
+from typing import Dict, List, Optional
+import logging
+import os
 import re
 
+try:
+    import numpy as np
+    import onnxruntime as ort
+    from tokenizers import Tokenizer
+    ROUTER_AVAILABLE = True
+except ImportError:
+    ROUTER_AVAILABLE = False
+
+
+log = logging.getLogger(__name__)
+
+# INT8-quantized ONNX export of BAAI/bge-small-en-v1.5 (model + tokenizer.json)
+ROUTER_MODEL_DIR = os.getenv("INTENT_ROUTER_MODEL_DIR", "/models/bge-small-en-v1.5-int8")
+ROUTER_MAX_TOKENS = 128
+
+# Regex hits at or above this are trusted without running the router
+CONFIDENT_STRUCTURED_HITS = 2
+
 
 class QueryType(str, Enum):
     SEMANTIC = "semantic"
@@ -19,18 +41,114 @@ STRUCTURED_PATTERNS = [
     r"\brg_index\b",
 ]
 
+# All structured keywords in one pass over the query
+_STRUCTURED_RE = re.compile(
+    r"\b(?:start|end|address|range|mpu|profile|project|version|xpu|rg_index)\b"
+)
+
+
+# Canonical utterances per class; embedded once into the route matrix
+ROUTE_PROTOTYPES: Dict[QueryType, List[str]] = {
+    QueryType.STRUCTURED: [
+        "list all MPU regions for project KAANAPALI version 5.3",
+        "get policy for address range 0x01D24000 to 0x01D32000",
+        "how many regions does this xpu have",
+        "show rg_index 4 profile TZ start and end address",
+    ],
+    QueryType.SEMANTIC: [
+        "explain the security intent of this access control policy",
+        "why is this region configured as static",
+        "what is the rationale behind restricting write access",
+        "describe how the firewall protects the modem subsystem",
+    ],
+    QueryType.HYBRID: [
+        "why does the IPA MPU in KAANAPALI block writes to that range",
+        "explain the policy covering address 0x10001000 in version 5.3",
+        "what is the purpose of the TZ profile regions on ANOC",
+        "justify the read domains for region 3 of this project",
+    ],
+}
+
+
+class IntentRouter:
+    """
+    Zero-token intent router: one local INT8 ONNX embedding + one
+    int8 matmul against the prototype matrix.
+    """
+
+    def __init__(self, model_dir: str = ROUTER_MODEL_DIR):
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(ROUTER_MAX_TOKENS)
+        self.tokenizer.enable_padding()
+
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, "model_quantized.onnx"),
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.labels: List[QueryType] = []
+        texts: List[str] = []
+        for label, examples in ROUTE_PROTOTYPES.items():
+            self.labels.extend([label] * len(examples))
+            texts.extend(examples)
+
+        # (num_prototypes, dim) int8, widened once for integer matmul
+        self.routes = self._quantize(self._embed(texts)).astype(np.int32)
+
+    @staticmethod
+    def _quantize(vectors: "np.ndarray") -> "np.ndarray":
+        return np.round(vectors * 127.0).astype(np.int8)
+
+    def _embed(self, texts: List[str]) -> "np.ndarray":
+        encodings = self.tokenizer.encode_batch(texts)
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+        }
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(feeds["input_ids"])
+
+        hidden = self.session.run(None, feeds)[0]
+
+        # bge uses CLS pooling + L2 normalisation
+        cls = hidden[:, 0, :]
+        return cls / np.linalg.norm(cls, axis=1, keepdims=True)
+
+    def classify(self, query: str) -> QueryType:
+        q = self._quantize(self._embed([query])[0]).astype(np.int32)
+        scores = self.routes @ q
+        return self.labels[int(np.argmax(scores))]
+
+
+@lru_cache(maxsize=1)
+def get_intent_router() -> Optional[IntentRouter]:
+    if not ROUTER_AVAILABLE:
+        return None
+
+    try:
+        return IntentRouter()
+    except Exception as e:
+        log.warning("Intent router unavailable, using regex only: %s", e)
+        return None
+
 
 def classify_query(query: str) -> QueryType:
     q = query.lower()
 
-    structured_hits = sum(
-        1 for p in STRUCTURED_PATTERNS if re.search(p, q)
-    )
+    structured_hits = len(set(_STRUCTURED_RE.findall(q)))
+
+    # Regex fast-exit: strong structured signal needs no embedding
+    if structured_hits < CONFIDENT_STRUCTURED_HITS:
+        router = get_intent_router()
+        if router is not None:
+            return router.classify(query)
+
+    if not structured_hits:
+        return QueryType.SEMANTIC
 
     semantic_hits = len(q.split()) > 5
 
-    if structured_hits and semantic_hits:
+    if semantic_hits:
         return QueryType.HYBRID
-    if structured_hits:
-        return QueryType.STRUCTURED
-    return QueryType.SEMANTIC
+    return QueryType.STRUCTURED
@@ -1,5 +1,7 @@
 
-def insert_chunk(cur, row):
+from psycopg2.extras import execute_values
+
+def insert_chunks_bulk(cur, rows):
 
     sql = """
         INSERT INTO policy_chunks (
@@ -11,7 +13,7 @@ def insert_chunk(cur, row):
             vector_id, xml_path,
             is_active
         )
-        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,TRUE)
+        VALUES %s
         ON CONFLICT (identity_hash, chunk_index)
         DO UPDATE SET
             content_hash = EXCLUDED.content_hash,
@@ -22,35 +24,46 @@ def insert_chunk(cur, row):
         RETURNING id;
     """
 
-    params = (
-        row["project"],
-        row["mpu_name"],
-        row["rg_index"],
-        row["profile"],
-        row["start_hex"],
-        row["end_hex"],
-        row["start_dec"],
-        row["end_dec"],
-        row["identity_hash"],
-        row["content_hash"],
-        row["chunk_index"],
-        row["chunk_text"],
-        row["vector_id"],
-        row["xml_path"],
-    )
+    # DO UPDATE may not touch the same key twice in one statement: last row wins
+    unique = {(row["identity_hash"], row["chunk_index"]): row for row in rows}
+
+    params = [
+        (
+            row["project"],
+            row["mpu_name"],
+            row["rg_index"],
+            row["profile"],
+            row["start_hex"],
+            row["end_hex"],
+            row["start_dec"],
+            row["end_dec"],
+            row["identity_hash"],
+            row["content_hash"],
+            row["chunk_index"],
+            row["chunk_text"],
+            row["vector_id"],
+            row["xml_path"],
+        )
+        for row in unique.values()
+    ]
 
     try:
-        cur.execute(sql, params)
-        new_id = cur.fetchone()
-        print(f"[DB] fetch from DB {new_id}")
-        return new_id[0] if new_id else None
+        new_ids = execute_values(
+            cur, sql, params,
+            template="(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,TRUE)",
+            page_size=500,
+            fetch=True,
+        )
+        print(f"[DB] upserted {len(new_ids)} rows")
+        return [r[0] for r in new_ids]
 
     except Exception as e:
-        print("[DB] ERROR insert_chunk:", e)
-        print("ROW Data:", row)
-        return None
+        print("[DB] ERROR insert_chunks_bulk:", e)
+        print("ROW count:", len(params))
+        return []
 
 
+import os
 
 POSTGRES = {
     "host": "localhost",
@@ -67,7 +80,17 @@ WEAVIATE = {
 
 EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 
+# cuda -> fp16 torch weights; anything else -> int8 ONNX graph shipped with the model
+# (use onnx/model_quint8_avx2.onnx on CPUs without AVX-512 VNNI)
+EMBED_DEVICE = "cpu"
+EMBED_ONNX_FILE = "onnx/model_qint8_avx512_vnni.onnx"
+EMBED_THREADS = int(os.getenv("EMBED_THREADS", os.cpu_count()))
+
+# Shared Infinity/TEI server (e.g. http://tei:7997); when set no model is loaded in-process
+EMBED_SERVER_URL = os.getenv("EMBEDDING_SERVER_URL")
+
 import hashlib, json
+import orjson
 
 def normalize_profile(p):
     return p.strip() if p and p.strip() else "TZ"
@@ -77,43 +100,275 @@ def identity_hash(project, mpu, rg, profile, start, end):
     return hashlib.sha256(k.encode()).hexdigest()
 
 def content_hash(data: dict):
-    return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+    # Change detection only: 16-byte blake2b over sorted-key orjson
+    return hashlib.blake2b(orjson.dumps(data, option=orjson.OPT_SORT_KEYS), digest_size=16).hexdigest()
     
+import io
+import re
 import psycopg2, requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import numpy as np
 from sentence_transformers import SentenceTransformer
-from config import POSTGRES, WEAVIATE, EMBED_MODEL
+from config import POSTGRES, WEAVIATE, EMBED_MODEL, EMBED_DEVICE, EMBED_ONNX_FILE, EMBED_THREADS, EMBED_SERVER_URL
 
 db = psycopg2.connect(**POSTGRES)
 db.autocommit = False
 cur = db.cursor()
 
-embedder = SentenceTransformer(EMBED_MODEL)
+class RemoteEmbedder:
+    """
+    Drop-in for the SentenceTransformer calls below, backed by the
+    OpenAI-style /embeddings route of a shared embedding server.
+    """
+
+    def __init__(self, url, model):
+        self.url = url.rstrip("/") + "/embeddings"
+        self.model = model
+        self.dim = None
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(
+            pool_connections=2,
+            pool_maxsize=8,
+            max_retries=Retry(total=3, backoff_factor=0.2),
+        ))
+
+    def encode(self, texts, batch_size=64, **_):
+        # Like SentenceTransformer: a single str gives one 1-D vector
+        if isinstance(texts, str):
+            return self.encode([texts], batch_size=batch_size)[0]
+
+        vectors = []
+        for i in range(0, len(texts), batch_size):
+            r = self.session.post(
+                self.url,
+                data=orjson.dumps({"model": self.model, "input": texts[i:i + batch_size]}),
+                headers={"Content-Type": "application/json"},
+                timeout=60,
+            )
+            r.raise_for_status()
+            data = sorted(orjson.loads(r.content)["data"], key=lambda d: d["index"])
+            vectors.extend(d["embedding"] for d in data)
+        return np.asarray(vectors, dtype=np.float32)
+
+    def get_sentence_embedding_dimension(self):
+        if self.dim is None:
+            self.dim = self.encode(["dimension probe"]).shape[1]
+        return self.dim
+
+def load_embedder():
+    if EMBED_SERVER_URL:
+        return RemoteEmbedder(EMBED_SERVER_URL, EMBED_MODEL)
+    if EMBED_DEVICE == "cuda":
+        return SentenceTransformer(
+            EMBED_MODEL, device="cuda", model_kwargs={"torch_dtype": "float16"}
+        )
+    import onnxruntime as ort
+
+    opts = ort.SessionOptions()
+    opts.intra_op_num_threads = EMBED_THREADS
+    return SentenceTransformer(
+        EMBED_MODEL,
+        backend="onnx",
+        model_kwargs={
+            "file_name": EMBED_ONNX_FILE,
+            "provider": "CPUExecutionProvider",
+            "session_options": opts,
+        },
+    )
+
+embedder = load_embedder()
+
+# (max words, batch size): shorter buckets pad less, so they afford bigger batches
+ENCODE_BUCKETS = ((128, 256), (256, 128), (512, 64))
+
+def encode_bucketed(texts):
+    """
+    Encode texts grouped by word length, returning vectors in input order.
+    """
+    lens = np.fromiter((len(t.split()) for t in texts), dtype=np.int64, count=len(texts))
+    order = np.argsort(lens, kind="stable")
+    sorted_lens = lens[order]
+
+    out = np.empty((len(texts), embedder.get_sentence_embedding_dimension()), dtype=np.float32)
+
+    lo = 0
+    for i, (max_words, batch_size) in enumerate(ENCODE_BUCKETS):
+        last = i == len(ENCODE_BUCKETS) - 1
+        hi = len(texts) if last else int(np.searchsorted(sorted_lens, max_words, side="right"))
+        if hi > lo:
+            idx = order[lo:hi]
+            out[idx] = embedder.encode(
+                [texts[j] for j in idx], batch_size=batch_size, show_progress_bar=False
+            )
+        lo = hi
+
+    return out
+
+# Boilerplate PRTn fragments repeat across MPUs/versions: embed each text once
+VECTOR_CACHE_SIZE = 50_000
+_vec_cache = {}
+
+def encode_cached(texts):
+    """
+    encode_bucketed over texts not seen before; repeats (in this call
+    or earlier ones) are served from _vec_cache. Embed stage only.
+    """
+    keys = [hashlib.blake2b(t.encode(), digest_size=16).digest() for t in texts]
+
+    out = np.empty((len(texts), embedder.get_sentence_embedding_dimension()), dtype=np.float32)
+    misses = {}
+
+    for i, key in enumerate(keys):
+        vector = _vec_cache.get(key)
+        if vector is not None:
+            out[i] = vector
+        else:
+            misses.setdefault(key, []).append(i)
+
+    if misses:
+        miss_keys = list(misses)
+        vectors = encode_bucketed([texts[misses[k][0]] for k in miss_keys])
+
+        if len(_vec_cache) + len(miss_keys) > VECTOR_CACHE_SIZE:
+            _vec_cache.clear()
+
+        for key, vector in zip(miss_keys, vectors):
+            out[misses[key]] = vector
+            _vec_cache[key] = vector
+
+    return out
+
+_WORD_RE = re.compile(r"\S+")
 
 def chunk_text(text, size=512):
-    words = text.split()
-    for i in range(0, len(words), size):
-        yield i // size, " ".join(words[i:i+size])
+    """
+    size-word chunks sliced straight out of text; only chunk
+    boundaries are kept, not a list of every word.
+    """
+    chunks = []
+    start = end = None
+    n = 0
+
+    for n, m in enumerate(_WORD_RE.finditer(text)):
+        if n % size == 0:
+            if start is not None:
+                chunks.append((n // size - 1, text[start:end]))
+            start = m.start()
+        end = m.end()
+
+    if start is not None:
+        chunks.append((n // size, text[start:end]))
+
+    return chunks
         
         
 import uuid
 
-def insert_vector(chunk, meta):
-    vector = embedder.encode(chunk).tolist()
-    vid = str(uuid.uuid4())
+# Bodies are pre-serialized with orjson (numpy vectors included)
+JSON_HEADERS = {"Content-Type": "application/json"}
 
-    payload = {
-        "class": WEAVIATE["class"],
-        "id": vid,
-        "properties": meta,
-        "vector": vector
-    }
+# One keep-alive pool for every Weaviate call in this module
+_weaviate = requests.Session()
+_weaviate.mount("http://", HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.2),
+))
 
-    r = requests.post(
-        f"{WEAVIATE['url']}/v1/objects",
-        json=payload
-    )
-    r.raise_for_status()
-    return vid
+WEAVIATE_BATCH_SIZE = 100
+
+def insert_vectors_bulk(chunks, metas, vectors):
+    """
+    Insert precomputed vectors through /v1/batch/objects.
+    Returns the new object ids in input order.
+    """
+    vids = [str(uuid.uuid4()) for _ in chunks]
+
+    objects = [
+        {
+            "class": WEAVIATE["class"],
+            "id": vid,
+            "properties": meta,
+            "vector": vector
+        }
+        for vid, meta, vector in zip(vids, metas, vectors)
+    ]
+
+    for i in range(0, len(objects), WEAVIATE_BATCH_SIZE):
+        r = _weaviate.post(
+            f"{WEAVIATE['url']}/v1/batch/objects",
+            data=orjson.dumps(
+                {"objects": objects[i:i + WEAVIATE_BATCH_SIZE]},
+                option=orjson.OPT_SERIALIZE_NUMPY
+            ),
+            headers=JSON_HEADERS
+        )
+        r.raise_for_status()
+
+        # The batch call returns 200 even when single objects fail
+        for obj in r.json():
+            errors = (obj.get("result") or {}).get("errors")
+            if errors:
+                raise RuntimeError(f"Weaviate batch insert failed for {obj.get('id')}: {errors}")
+
+    return vids
+
+def known_content_hashes():
+    """
+    identity_hash -> active content_hash, or None if only inactive rows exist.
+    Identities missing from the result have never been stored.
+    """
+    cur.execute("""
+        SELECT DISTINCT ON (identity_hash)
+            identity_hash,
+            CASE WHEN is_active THEN content_hash END
+        FROM policy_chunks
+        ORDER BY identity_hash, is_active DESC
+    """)
+    return dict(cur.fetchall())
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+def _copy_field(value):
+    # COPY text format: \N is NULL, so '' stays an empty string like INSERT
+    if value is None:
+        return "\\N"
+    if isinstance(value, str):
+        return value.translate(_COPY_ESCAPES)
+    return str(value)
+
+def copy_chunks(rows):
+    """
+    COPY rows for identities that have never been stored, skipping the
+    per-row INSERT/ON CONFLICT work. COPY has no ON CONFLICT, so repeated
+    (identity_hash, chunk_index) pairs are dropped here, first one wins,
+    as DO NOTHING would; callers must not pass keys already in the table.
+    """
+    seen = set()
+    buf = io.StringIO()
+    for row in rows:
+        key = (row[7], row[9])   # identity_hash, chunk_index
+        if key in seen:
+            continue
+        seen.add(key)
+        buf.write("\t".join(map(_copy_field, row + (True,))))
+        buf.write("\n")
+    buf.seek(0)
+
+    cur.copy_expert("""
+        COPY policy_chunks (
+            project, mpu_name, rg_index, profile,
+            start_dec, end_dec,
+            policy_version,
+            identity_hash, content_hash,
+            chunk_index, chunk_text,
+            vector_id,
+            xml_path,
+            is_active
+        )
+        FROM STDIN WITH (FORMAT text)
+    """, buf)
 
 def deactivate_old(identity):
     cur.execute("""
@@ -122,8 +377,8 @@ def deactivate_old(identity):
         WHERE identity_hash = %s AND is_active = TRUE
     """, (identity,))
     
-def insert_chunk(row):
-    cur.execute("""
+def insert_chunks(rows):
+    execute_values(cur, """
         INSERT INTO policy_chunks (
             project, mpu_name, rg_index, profile,
             start_dec, end_dec,
@@ -134,86 +389,206 @@ def insert_chunk(row):
             is_active,
             xml_path
         )
-        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,TRUE,%s)
+        VALUES %s
         ON CONFLICT (identity_hash, chunk_index) DO NOTHING
-    """, row)
-    from lxml import etree
-
-def parse_xml(xml_path):
-    tree = etree.parse(xml_path)
-    root = tree.getroot()
+    """, rows, template="(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,TRUE,%s)", page_size=500)
 
-    project = root.get("project")
-    version = root.get("version")
+from lxml import etree
 
-    for mpu in root.findall(".//MPU"):
-        mpu_name = mpu.get("name")
-
-        for prtn in mpu.findall(".//PRTn"):
-            rg = int(prtn.get("index"))
-            profile = normalize_profile(prtn.get("profile"))
+def parse_xml(xml_path):
+    """
+    Stream PRTn policies without building the whole tree. A PRTn is
+    handled on the event after its end tag, once its tail text has been
+    parsed, so content (and content_hash) is stable across parses; each
+    PRTn and its already-processed siblings are freed once yielded.
+    """
+    project = version = None
+    pending = None
+
+    for event, elem in etree.iterparse(xml_path, events=("start", "end")):
+        if pending is not None:
+            mpu = next(pending.iterancestors("MPU"), None)
+            if mpu is not None:
+                rg = int(pending.get("index"))
+                profile = normalize_profile(pending.get("profile"))
+
+                start = int(pending.get("start"), 16)
+                end   = int(pending.get("end"), 16)
+
+                content = etree.tostring(pending, encoding="unicode")
+
+                yield {
+                    "project": project,
+                    "mpu": mpu.get("name"),
+                    "rg": rg,
+                    "profile": profile,
+                    "start": start,
+                    "end": end,
+                    "policy_version": version,
+                    "content": content
+                }
+
+            pending.clear()
+            while pending.getprevious() is not None:
+                del pending.getparent()[0]
+            pending = None
+
+        if event == "start":
+            # Only the root has no parent: it carries project/version
+            if elem.getparent() is None:
+                project = elem.get("project")
+                version = elem.get("version")
+        elif elem.tag == "PRTn":
+            pending = elem
+
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+PIPELINE_QUEUE_SIZE = 8
+EMBED_BATCH = 64
+
+_DONE = object()
+
+def _drain(q):
+    while q.get() is not _DONE:
+        pass
+
+def _embed_stage(chunks_q, writes_q):
+    """
+    Stage 2: group parsed chunks into EMBED_BATCH-sized encode calls.
+    """
+    batch = []
+    try:
+        while True:
+            item = chunks_q.get()
+            if item is not _DONE:
+                batch.append(item)
+
+            if batch and (item is _DONE or len(batch) >= EMBED_BATCH):
+                vectors = encode_cached([chunk for *_, chunk in batch])
+                writes_q.put((batch, vectors))
+                batch = []
+
+            if item is _DONE:
+                return
+    except Exception:
+        # Keep the parser from blocking on a full queue
+        _drain(chunks_q)
+        raise
+    finally:
+        writes_q.put(_DONE)
+
+def _write_stage(writes_q, xml_path, known):
+    """
+    Stage 3: deactivate, batch-insert vectors, then write rows.
+    Never-seen identities go through COPY, the rest through
+    execute_values. Only this thread touches the cursor.
+    """
+    deactivated = set()
+    copied = set()
+    try:
+        while True:
+            item = writes_q.get()
+            if item is _DONE:
+                return
 
-            start = int(prtn.get("start"), 16)
-            end   = int(prtn.get("end"), 16)
+            batch, vectors = item
 
-            content = etree.tostring(prtn, encoding="unicode")
+            vector_ids = insert_vectors_bulk(
+                [chunk for *_, chunk in batch],
+                [meta for meta, *_ in batch],
+                vectors
+            )
 
-            yield {
-                "project": project,
-                "mpu": mpu_name,
-                "rg": rg,
-                "profile": profile,
-                "start": start,
-                "end": end,
-                "policy_version": version,
-                "content": content
-            }
+            new_rows = []
+            upsert_rows = []
+
+            for (meta, identity, content_h, idx, chunk), vector_id in zip(batch, vector_ids):
+                row = (
+                    meta["project"],
+                    meta["mpu"],
+                    meta["rg"],
+                    meta["profile"],
+                    meta["start"],
+                    meta["end"],
+                    meta["version"],
+                    identity,
+                    content_h,
+                    idx,
+                    chunk,
+                    vector_id,
+                    xml_path
+                )
+
+                if identity not in known:
+                    # First sighting this run goes to COPY; repeats must upsert
+                    if (identity, idx) not in copied:
+                        copied.add((identity, idx))
+                        new_rows.append(row)
+                        continue
+                elif identity not in deactivated:
+                    # Deactivate old version first
+                    deactivate_old(identity)
+                    deactivated.add(identity)
+
+                upsert_rows.append(row)
+
+            if new_rows:
+                copy_chunks(new_rows)
+            if upsert_rows:
+                insert_chunks(upsert_rows)
+    except Exception:
+        # Keep the embed stage from blocking on a full queue
+        _drain(writes_q)
+        raise
 
 def ingest(xml_path):
+    """
+    Parse -> embed -> upsert as a bounded-queue pipeline, so the
+    encoder and the databases work at the same time.
+    """
     print("Parsing:", xml_path)
 
-    for policy in parse_xml(xml_path):
-        meta = {
-            "project": policy["project"],
-            "mpu": policy["mpu"],
-            "rg": policy["rg"],
-            "profile": policy["profile"],
-            "start": policy["start"],
-            "end": policy["end"],
-            "version": policy["policy_version"]
-        }
-
-        identity = identity_hash(**meta)
-        content_h = content_hash(policy)
-
-        # Deactivate old version first
-        deactivate_old(identity)
-
-        for idx, chunk in chunk_text(policy["content"]):
-            vector_id = insert_vector(chunk, meta)
-
-            row = (
-                meta["project"],
-                meta["mpu"],
-                meta["rg"],
-                meta["profile"],
-                meta["start"],
-                meta["end"],
-                meta["version"],
-                identity,
-                content_h,
-                idx,
-                chunk,
-                vector_id,
-                xml_path
-            )
-
-            insert_chunk(row)
+    # Read before the writer thread owns the cursor
+    known = known_content_hashes()
+    skipped = 0
+
+    chunks_q = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE * EMBED_BATCH)
+    writes_q = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        embedding = pool.submit(_embed_stage, chunks_q, writes_q)
+        writing = pool.submit(_write_stage, writes_q, xml_path, known)
+
+        # Stage 1: parse and chunk on this thread
+        try:
+            for policy in parse_xml(xml_path):
+                meta = {
+                    "project": policy["project"],
+                    "mpu": policy["mpu"],
+                    "rg": policy["rg"],
+                    "profile": policy["profile"],
+                    "start": policy["start"],
+                    "end": policy["end"],
+                    "version": policy["policy_version"]
+                }
+
+                identity = identity_hash(**meta)
+                content_h = content_hash(policy)
+
+                # Unchanged policy: nothing to embed, deactivate or insert
+                if known.get(identity) == content_h:
+                    skipped += 1
+                    continue
+
+                for idx, chunk in chunk_text(policy["content"]):
+                    chunks_q.put((meta, identity, content_h, idx, chunk))
+        finally:
+            chunks_q.put(_DONE)
+
+        embedding.result()
+        writing.result()
 
     db.commit()
+    print(f"Skipped {skipped} unchanged policies")
     print("✅ Ingestion completed successfully")
-    
-
-
-
-
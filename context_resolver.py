@@ -1,13 +1,19 @@
 import re
 from dataclasses import dataclass
-from typing import Optional, Dict
+from typing import Optional, Dict, Tuple
+
+try:
+    # google-re2: linear-time automaton, no backtracking on hostile input
+    import re2 as regex_engine
+except ImportError:
+    regex_engine = re
 
 
 # ---------------------------
 # Output contract
 # ---------------------------
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ContextResult:
     project: Optional[str]
     version: Optional[str]
@@ -25,6 +31,7 @@ class ContextResolver:
     Extracts required context from user query.
     Never raises.
     Never queries DB.
+    Stateless: every method is static, so instances are interchangeable.
     """
 
     PROJECT_RE = re.compile(r"\b([A-Z][A-Z0-9_-]{2,})\b")
@@ -32,8 +39,18 @@ class ContextResolver:
     MPU_RE = re.compile(r"\bMPU[_\-\w]+\b", re.I)
     PROFILE_RE = re.compile(r"\b(MSA|TZ|TME_FW|TME_ROM)\b", re.I)
 
+    # All four in one left-to-right scan; project stays case-sensitive.
+    # Inline flags only, so the same pattern compiles under re and re2.
+    CONTEXT_RE = regex_engine.compile(
+        r"(?i)"
+        r"(?P<version>\b(?:v|version)\s*(?P<version_num>[0-9]+(?:\.[0-9]+)*)\b)"
+        r"|(?P<mpu>\bMPU[_\-\w]+\b)"
+        r"|(?P<profile>\b(?:MSA|TZ|TME_FW|TME_ROM)\b)"
+        r"|(?-i:\b(?P<project>[A-Z][A-Z0-9_-]{2,})\b)"
+    )
+
+    @staticmethod
     def resolve(
-        self,
         query: str,
         prior_context: Optional[Dict[str, str]] = None,
     ) -> ContextResult:
@@ -44,13 +61,13 @@ class ContextResolver:
 
         prior_context = prior_context or {}
 
-        project = self._extract_project(query) or prior_context.get("project")
-        version = self._extract_version(query) or prior_context.get("version")
-        mpu = self._extract_mpu(query)
-        profile = self._extract_profile(query)
+        project, version, mpu, profile = ContextResolver._extract_all(query)
+
+        project = project or prior_context.get("project")
+        version = version or prior_context.get("version")
 
         # Decide clarification
-        clarification = self._clarify(project, version)
+        clarification = ContextResolver._clarify(project, version)
 
         return ContextResult(
             project=project,
@@ -64,32 +81,38 @@ class ContextResolver:
     # Extraction helpers
     # ---------------------------
 
-    def _extract_project(self, query: str) -> Optional[str]:
-        matches = self.PROJECT_RE.findall(query)
-        if not matches:
-            return None
-
-        # Heuristic: longest uppercase token is project
-        return max(matches, key=len)
-
-    def _extract_version(self, query: str) -> Optional[str]:
-        match = self.VERSION_RE.search(query)
-        return match.group(2) if match else None
-
-    def _extract_mpu(self, query: str) -> Optional[str]:
-        match = self.MPU_RE.search(query)
-        return match.group(0) if match else None
-
-    def _extract_profile(self, query: str) -> Optional[str]:
-        match = self.PROFILE_RE.search(query)
-        return match.group(1).upper() if match else None
+    @staticmethod
+    def _extract_all(query: str) -> Tuple[Optional[str], ...]:
+        """
+        One pass over the query. Version/MPU/profile keep their first
+        match; the longest uppercase token is the project. A token that
+        is an MPU or profile name is no longer a project candidate.
+        """
+        project = version = mpu = profile = None
+
+        for m in ContextResolver.CONTEXT_RE.finditer(query):
+            # Group checks rather than lastgroup: portable across engines
+            token = m.group("project")
+            if token is not None:
+                if project is None or len(token) > len(project):
+                    project = token
+            elif m.group("version") is not None:
+                if version is None:
+                    version = m.group("version_num")
+            elif m.group("mpu") is not None:
+                if mpu is None:
+                    mpu = m.group("mpu")
+            elif profile is None:
+                profile = m.group("profile").upper()
+
+        return project, version, mpu, profile
 
     # ---------------------------
     # Clarification logic
     # ---------------------------
 
+    @staticmethod
     def _clarify(
-        self,
         project: Optional[str],
         version: Optional[str],
     ) -> Optional[str]:
@@ -0,0 +1,271 @@
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List, Callable
+
+import numpy as np
+
+
+# =========================
+# LRU + TTL Cache
+# =========================
+
+class LRUTTLCache:
+    """
+    Thread-safe LRU cache with per-entry TTL.
+    """
+
+    def __init__(self, max_size: int = 2000, ttl_seconds: int = 300):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.RLock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        raw = "|".join(str(p) for p in parts)
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+
+            if entry is None:
+                self._misses += 1
+                return None
+
+            value, expiry = entry
+            if time.monotonic() >= expiry:
+                del self._data[key]
+                self._misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key: str, value: Any):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+            }
+
+
+# =========================
+# Query Embedding Cache
+# =========================
+
+class QueryEmbeddingCache(LRUTTLCache):
+    """
+    LRU + TTL cache for query embedding vectors.
+    Vectors are held as float16 and widened back to float32 on read.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 2000,
+        ttl_seconds: int = 300,
+        store_dtype=np.float16,
+    ):
+        super().__init__(max_size=max_size, ttl_seconds=ttl_seconds)
+        self.store_dtype = store_dtype
+
+    @staticmethod
+    def make_key(text: str, model: str) -> str:
+        # The vector depends only on the embedded text and the model
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+        return f"{model}|{digest}"
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        vector = super().get(key)
+        return None if vector is None else vector.astype(np.float32)
+
+    def put(self, key: str, vector: np.ndarray):
+        super().put(key, np.asarray(vector).astype(self.store_dtype))
+
+
+# =========================
+# Async Micro-batcher
+# =========================
+
+class EmbeddingBatcher:
+    """
+    Collects concurrent embed requests for a short window and sends them
+    to the embedder as a single embed_documents call.
+    """
+
+    def __init__(
+        self,
+        embed_documents: Callable[[List[str]], List[List[float]]],
+        window_ms: int = 20,
+        max_batch: int = 64,
+    ):
+        self.embed_documents = embed_documents
+        self.window_ms = window_ms
+        self.max_batch = max_batch
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    async def embed(self, text: str) -> np.ndarray:
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.monotonic() + self.window_ms / 1000
+
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [text for text, _ in batch]
+            try:
+                vectors = await asyncio.to_thread(self.embed_documents, texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            matrix = np.asarray(vectors, dtype=np.float32)
+            for (_, future), vec in zip(batch, matrix):
+                if not future.done():
+                    future.set_result(vec)
+
+
+# =========================
+# Semantic Query Cache
+# =========================
+
+class SemanticCache:
+    """
+    Query -> vector cache with an exact and a nearest-neighbour tier.
+    Exact hits are keyed on the normalised query text; otherwise the
+    query's own embedding is matched against cached keys by cosine
+    similarity. LRU-bounded; key embeddings live in one fixed matrix.
+    """
+
+    def __init__(self, max_size: int = 1000, threshold: float = 0.97):
+        self.max_size = max_size
+        self.threshold = threshold
+
+        # key -> (slot, value); slot indexes a row of _keys
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._slot_key: List[Optional[str]] = [None] * max_size
+        self._free = list(range(max_size - 1, -1, -1))
+        self._keys: Optional[np.ndarray] = None
+        self._valid = np.zeros(max_size, dtype=bool)
+        self._lock = threading.RLock()
+
+        self._exact_hits = 0
+        self._semantic_hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def make_key(query: str) -> str:
+        return hashlib.sha256(query.strip().lower().encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def get_exact(self, query: str) -> Any:
+        key = self.make_key(query)
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            self._data.move_to_end(key)
+            self._exact_hits += 1
+            return entry[1]
+
+    def get_similar(self, query_vector) -> Any:
+        with self._lock:
+            if self._keys is None or not self._valid.any():
+                self._misses += 1
+                return None
+
+            sims = self._keys @ self._unit(query_vector)
+            sims[~self._valid] = -1.0
+            slot = int(np.argmax(sims))
+
+            if sims[slot] < self.threshold:
+                self._misses += 1
+                return None
+
+            key = self._slot_key[slot]
+            self._data.move_to_end(key)
+            self._semantic_hits += 1
+            return self._data[key][1]
+
+    def put(self, query: str, query_vector, value: Any):
+        key = self.make_key(query)
+        unit = self._unit(query_vector)
+
+        with self._lock:
+            if self._keys is None:
+                self._keys = np.zeros((self.max_size, unit.shape[0]), dtype=np.float32)
+
+            entry = self._data.pop(key, None)
+            if entry is not None:
+                slot = entry[0]
+            else:
+                if not self._free:
+                    old_key, (old_slot, _) = self._data.popitem(last=False)
+                    self._valid[old_slot] = False
+                    self._slot_key[old_slot] = None
+                    self._free.append(old_slot)
+                slot = self._free.pop()
+
+            self._keys[slot] = unit
+            self._valid[slot] = True
+            self._slot_key[slot] = key
+            self._data[key] = (slot, value)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "max_size": self.max_size,
+                "exact_hits": self._exact_hits,
+                "semantic_hits": self._semantic_hits,
+                "misses": self._misses,
+            }
@@ -1,6 +1,9 @@
 from dataclasses import dataclass
 from typing import List, Optional
 import logging
+import os
+
+import httpx
 
 # QGenie SDK imports (adjust path if needed)
 from qgenie import QGenieEmbedding, QGenieEmbeddingConfig
@@ -16,6 +19,8 @@ class EmbeddingConfig:
     model: str = "stella_en_400M_v5"
     batch_size: int = 16
     timeout_sec: int = 60
+    # Shared Infinity/TEI server, e.g. http://tei:7997 (falls back to QGenie)
+    server_url: Optional[str] = os.getenv("EMBEDDING_SERVER_URL")
 
 
 class Embedder:
@@ -26,22 +31,49 @@ class Embedder:
     def __init__(self, config: Optional[EmbeddingConfig] = None):
         self.config = config or EmbeddingConfig()
 
-        self._client = QGenieEmbedding(
-            config=QGenieEmbeddingConfig(
-                model=self.config.model,
-                batch_size=self.config.batch_size,
-                timeout_sec=self.config.timeout_sec,
+        if self.config.server_url:
+            # Server batches across all workers; keep one pooled connection set
+            self._http = httpx.Client(
+                base_url=self.config.server_url,
+                timeout=self.config.timeout_sec,
             )
-        )
+            self._embed_fn = self._embed_remote
+        else:
+            self._client = QGenieEmbedding(
+                config=QGenieEmbeddingConfig(
+                    model=self.config.model,
+                    batch_size=self.config.batch_size,
+                    timeout_sec=self.config.timeout_sec,
+                )
+            )
+            self._embed_fn = self._client.embed_fn
 
         logger.info(
             "Embedder initialized",
             extra={
                 "model": self.config.model,
                 "batch_size": self.config.batch_size,
+                "server_url": self.config.server_url,
             },
         )
 
+    def _embed_remote(self, texts):
+        """
+        POST to the server's OpenAI-style /embeddings route.
+        Mirrors embed_fn: a str returns one vector, a list returns a list.
+        """
+        single = isinstance(texts, str)
+
+        resp = self._http.post(
+            "/embeddings",
+            json={"model": self.config.model, "input": [texts] if single else texts},
+        )
+        resp.raise_for_status()
+
+        data = sorted(resp.json()["data"], key=lambda d: d["index"])
+        vectors = [d["embedding"] for d in data]
+        return vectors[0] if single else vectors
+
     def embed_text(self, text: str) -> List[float]:
         """
         Generate embedding for a single text input.
@@ -50,7 +82,7 @@ class Embedder:
             raise ValueError("Cannot embed empty text")
 
         try:
-            vector = self._client.embed_fn(text)
+            vector = self._embed_fn(text)
 
             if not vector:
                 raise RuntimeError("Empty embedding returned")
@@ -70,7 +102,7 @@ class Embedder:
             return []
 
         try:
-            vectors = self._client.embed_fn(texts)
+            vectors = self._embed_fn(texts)
 
             if len(vectors) != len(texts):
                 raise RuntimeError("Embedding count mismatch")
@@ -1,4 +1,8 @@
+import asyncio
+import inspect
+
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse
 from app.api.models import QueryRequest, QueryResponse, SourceChunk
 from app.rag.router import RAGRouter
 
@@ -7,8 +11,16 @@ def create_app(rag_router: RAGRouter) -> FastAPI:
     app = FastAPI(
         title="Policy RAG API",
         version="1.0",
+        default_response_class=ORJSONResponse,
     )
 
+    # Blocking (psycopg2 / requests) routers must not run on the event loop
+    if inspect.iscoroutinefunction(rag_router.query):
+        run_query = rag_router.query
+    else:
+        async def run_query(**kwargs):
+            return await asyncio.to_thread(rag_router.query, **kwargs)
+
     @app.post("/query", response_model=QueryResponse)
     async def query_endpoint(req: QueryRequest):
         # 1️⃣ Validate required context
@@ -19,7 +31,7 @@ def create_app(rag_router: RAGRouter) -> FastAPI:
             )
 
         # 2️⃣ Call router → RAGService
-        result = await rag_router.query(
+        result = await run_query(
             query=req.query,
             project=req.project,
             version=req.version,
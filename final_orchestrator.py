@@ -42,6 +42,17 @@ class Orchestrator:
         self.executor = executor
         self.hyde_writer = hyde_writer
 
+        # Built once: client construction and patch() are not per-query work
+        logger.debug("Initializing Instructor client")
+
+        self._instruct_client = patch(
+            QGenieOpenAIClient(
+                QGenieClient(),
+                default_model="llama3.1-8b",
+            ),
+            mode=Mode.JSON_SCHEMA,
+        )
+
     # ---------------------------------------------------------
     # Public entrypoint
     # ---------------------------------------------------------
@@ -93,23 +104,10 @@ class Orchestrator:
         user_query: str,
         hyde_text: str,
     ) -> QueryFacts:
-        logger.debug("Initializing Instructor client")
-
-        raw_client = QGenieClient()
-        openai_client = QGenieOpenAIClient(
-            raw_client,
-            default_model="llama3.1-8b",
-        )
-
-        instruct_client = patch(
-            openai_client,
-            mode=Mode.JSON_SCHEMA,
-        )
-
         logger.debug("Extracting structured query facts")
 
         facts: QueryFacts = extract_query_facts(
-            instruct_client,
+            self._instruct_client,
             user_query,
             hyde_text,
         )
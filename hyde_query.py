@@ -13,8 +13,12 @@ User Query
 → Vector
 """
 
+import asyncio
 from typing import List
 
+# In-flight LLM rewrites per aembed_queries() call
+HYDE_CONCURRENCY = 10
+
 
 # -----------------------------
 # Interfaces (minimal contracts)
@@ -28,6 +32,12 @@ class LLMClient:
     def complete(self, prompt: str) -> str:
         raise NotImplementedError
 
+    async def acomplete(self, prompt: str) -> str:
+        """
+        Override with the SDK's native async call where one exists.
+        """
+        return await asyncio.to_thread(self.complete, prompt)
+
 
 class Embedder:
     """
@@ -36,6 +46,15 @@ class Embedder:
     def embed(self, text: str) -> List[float]:
         raise NotImplementedError
 
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """
+        Override with a single batched request where the backend has one.
+        """
+        return [self.embed(t) for t in texts]
+
+    async def aembed_batch(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(self.embed_batch, texts)
+
 
 # -----------------------------
 # HyDE prompt builder
@@ -76,11 +95,37 @@ class HydeQueryEmbedder:
         self.embedder = embedder
 
     def embed_query(self, user_query: str) -> List[float]:
-        # 1. Build HyDE prompt
-        hyde_prompt = build_hyde_prompt(user_query)
+        return self.embed_queries([user_query])[0]
+
+    def embed_queries(self, user_queries: List[str]) -> List[List[float]]:
+        # 1-3. Rewrite every query, then embed them all in one call
+        final_texts = [
+            self._embedding_text(q, self.llm.complete(build_hyde_prompt(q)))
+            for q in user_queries
+        ]
+
+        # 4. Embed
+        return self.embedder.embed_batch(final_texts)
+
+    async def aembed_query(self, user_query: str) -> List[float]:
+        return (await self.aembed_queries([user_query]))[0]
 
-        # 2. Get HyDE rewrite
-        rewritten = self.llm.complete(hyde_prompt).strip()
+    async def aembed_queries(self, user_queries: List[str]) -> List[List[float]]:
+        # 1-3. Rewrites run concurrently (bounded), then one batched embed
+        sem = asyncio.Semaphore(HYDE_CONCURRENCY)
+
+        async def final_text(q: str) -> str:
+            async with sem:
+                rewritten = await self.llm.acomplete(build_hyde_prompt(q))
+            return self._embedding_text(q, rewritten)
+
+        final_texts = await asyncio.gather(*(final_text(q) for q in user_queries))
+
+        # 4. Embed
+        return await self.embedder.aembed_batch(list(final_texts))
+
+    def _embedding_text(self, user_query: str, rewritten: str) -> str:
+        rewritten = rewritten.strip()
 
         # Safety fallback
         if not rewritten:
@@ -103,10 +148,7 @@ Search intent:
         print(final_text[:300])
         print("==================")
 
-        # 4. Embed
-        vector = self.embedder.embed(final_text)
-
-        return vector
+        return final_text
 
 
 # -----------------------------
@@ -1,16 +1,28 @@
 import os
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
 
 from qgenie.integrations.langchain import QGenieEmbeddings
 from qgenie.client import QGenieClient
 from qgenie.types import ChatMessage
 
+from embedding_cache import SemanticCache
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 QGENIE_API_KEY = os.getenv("QGENIE_API_KEY")
 
+# Concurrent rewrite calls per encode_many() batch
+HYDE_REWRITE_WORKERS = int(os.getenv("HYDE_REWRITE_WORKERS", 8))
+# In-flight rewrites per aencode_many() call
+HYDE_CONCURRENCY = int(os.getenv("HYDE_CONCURRENCY", 10))
+# Raw-query cosine similarity above which a cached HyDE vector is reused
+HYDE_CACHE_THRESHOLD = float(os.getenv("HYDE_CACHE_THRESHOLD", 0.97))
+HYDE_CACHE_SIZE = int(os.getenv("HYDE_CACHE_SIZE", 1000))
+
 
 # ---------------------------------------------------------
 # 1. LLM wrapper (HyDE-lite)
@@ -20,20 +32,23 @@ class HydeLLM:
     Generates a hypothetical document (HyDE-lite)
     """
 
+    SYSTEM_PROMPT = (
+        "You are an expert technical assistant.\n"
+        "Rewrite the user query into a short, factual paragraph "
+        "that would appear in the documentation answering it.\n"
+        "Do NOT mention that this is a rewrite.\n"
+        "Do NOT ask questions.\n"
+    )
+
+    # Identical leading message on every call -> prefix-cache friendly
+    _SYS = ChatMessage(role="system", content=SYSTEM_PROMPT)
+
     def __init__(self):
         self.client = QGenieClient(api_key=QGENIE_API_KEY)
 
     def rewrite(self, user_query: str) -> str:
-        system_prompt = (
-            "You are an expert technical assistant.\n"
-            "Rewrite the user query into a short, factual paragraph "
-            "that would appear in the documentation answering it.\n"
-            "Do NOT mention that this is a rewrite.\n"
-            "Do NOT ask questions.\n"
-        )
-
         messages = [
-            ChatMessage(role="system", content=system_prompt),
+            self._SYS,
             ChatMessage(role="user", content=user_query),
         ]
 
@@ -47,13 +62,27 @@ class HydeLLM:
         logger.info("HyDE text generated")
         return text
 
+    def rewrite_batch(self, user_queries: List[str]) -> List[str]:
+        # QGenieClient has no batch chat call: overlap the round-trips instead
+        if len(user_queries) <= 1:
+            return [self.rewrite(q) for q in user_queries]
+
+        workers = min(HYDE_REWRITE_WORKERS, len(user_queries))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(self.rewrite, user_queries))
+
+    async def arewrite(self, user_query: str) -> str:
+        # QGenieClient is sync-only; keep the event loop free
+        return await asyncio.to_thread(self.rewrite, user_query)
+
 
 # ---------------------------------------------------------
 # 2. Embedding wrapper (SAFE)
 # ---------------------------------------------------------
 class QueryEmbedder:
     """
-    Generates embeddings for a SINGLE query string.
+    Generates embeddings for a SINGLE query string (embed)
+    or a list of them in one request (embed_batch).
     """
 
     def __init__(self, model: str = "stella_en_400M_v5"):
@@ -74,6 +103,29 @@ class QueryEmbedder:
 
         return vectors
 
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        if any(not t or not t.strip() for t in texts):
+            raise ValueError("Cannot embed empty text")
+
+        vectors = self.emb.embed_documents(texts)
+
+        if len(vectors) != len(texts):
+            raise RuntimeError("Embedding count mismatch")
+
+        return vectors
+
+    async def aembed_batch(self, texts: List[str]) -> List[List[float]]:
+        if any(not t or not t.strip() for t in texts):
+            raise ValueError("Cannot embed empty text")
+
+        # LangChain Embeddings async API (native or executor-backed)
+        vectors = await self.emb.aembed_documents(texts)
+
+        if len(vectors) != len(texts):
+            raise RuntimeError("Embedding count mismatch")
+
+        return vectors
+
 
 # ---------------------------------------------------------
 # 3. Public API (what your pipeline calls)
@@ -87,17 +139,95 @@ class RagQueryEncoder:
     def __init__(self):
         self.hyde = HydeLLM()
         self.embedder = QueryEmbedder()
+        self.cache = SemanticCache(
+            max_size=HYDE_CACHE_SIZE,
+            threshold=HYDE_CACHE_THRESHOLD,
+        )
+
+    # Cache tiers: exact text, then raw-query embedding similarity.
+    # Only the remaining misses pay for a rewrite + HyDE embedding.
+
+    def _exact_hits(self, user_queries: List[str]):
+        results = [self.cache.get_exact(q) for q in user_queries]
+        pending = [i for i, v in enumerate(results) if v is None]
+        return results, pending
+
+    def _similar_hits(self, results, pending, raw_vectors):
+        misses = []
+        for i, raw in zip(pending, raw_vectors):
+            vector = self.cache.get_similar(raw)
+            if vector is None:
+                misses.append((i, raw))
+            else:
+                results[i] = vector
+        return misses
+
+    def _store(self, user_queries, results, misses, vectors):
+        for (i, raw), vector in zip(misses, vectors):
+            results[i] = vector
+            self.cache.put(user_queries[i], raw, vector)
 
     def encode(self, user_query: str) -> List[float]:
-        logger.info("User query: %s", user_query)
+        return self.encode_many([user_query])[0]
+
+    def encode_many(self, user_queries: List[str]) -> List[List[float]]:
+        if not user_queries:
+            return []
+
+        logger.info("User queries: %d", len(user_queries))
+
+        results, pending = self._exact_hits(user_queries)
+        if not pending:
+            return results
+
+        raw_vectors = self.embedder.embed_batch([user_queries[i] for i in pending])
+        misses = self._similar_hits(results, pending, raw_vectors)
+        if not misses:
+            return results
+
+        hyde_texts = self.hyde.rewrite_batch([user_queries[i] for i, _ in misses])
+        for (i, _), text in zip(misses, hyde_texts):
+            logger.info("HyDE text for %s: %s", user_queries[i], text)
 
-        hyde_text = self.hyde.rewrite(user_query)
-        logger.info("HyDE text: %s", hyde_text)
+        # One embedding request for every miss
+        vectors = self.embedder.embed_batch(hyde_texts)
+        logger.info("Embedding dimension: %d", len(vectors[0]))
+
+        self._store(user_queries, results, misses, vectors)
+        return results
+
+    async def aencode(self, user_query: str) -> List[float]:
+        return (await self.aencode_many([user_query]))[0]
+
+    async def aencode_many(self, user_queries: List[str]) -> List[List[float]]:
+        if not user_queries:
+            return []
+
+        results, pending = self._exact_hits(user_queries)
+        if not pending:
+            return results
+
+        raw_vectors = await self.embedder.aembed_batch([user_queries[i] for i in pending])
+        misses = self._similar_hits(results, pending, raw_vectors)
+        if not misses:
+            return results
+
+        sem = asyncio.Semaphore(HYDE_CONCURRENCY)
+
+        async def rewrite(q: str) -> str:
+            async with sem:
+                return await self.hyde.arewrite(q)
+
+        # Rewrites overlap; total ~ max(t_llm) + one embedding call
+        hyde_texts = await asyncio.gather(
+            *(rewrite(user_queries[i]) for i, _ in misses)
+        )
 
-        vector = self.embedder.embed(hyde_text)
-        logger.info("Embedding dimension: %d", len(vector))
+        vectors = await self.embedder.aembed_batch(list(hyde_texts))
+        logger.info("Embedding dimension: %d", len(vectors[0]))
 
-        return vector
+        self._store(user_queries, results, misses, vectors)
+        return results
 
 
 # ---------------------------------------------------------
@@ -1,73 +1,183 @@
 import uuid
 
-def insert_vector(chunk, meta):
-    vector = embedder.encode(chunk).tolist()
-    vid = str(uuid.uuid4())
+WEAVIATE_BATCH_SIZE = 100
 
-    payload = {
+# Object ids derive from (identity, content, chunk index): re-ingesting the
+# same policy overwrites its Weaviate objects instead of orphaning them
+VECTOR_NS = uuid.uuid5(uuid.NAMESPACE_URL, "policy_chunks")
+
+# Objects waiting for the next /v1/batch/objects call (see flush_vectors)
+_pending_objects = []
+
+def insert_vector(chunk, meta, identity, content_h, idx, vector):
+    vid = str(uuid.uuid5(VECTOR_NS, f"{identity}|{content_h}|{idx}"))
+
+    _pending_objects.append({
         "class": WEAVIATE["class"],
         "id": vid,
         "properties": meta,
         "vector": vector
-    }
+    })
 
-    r = requests.post(
-        f"{WEAVIATE['url']}/v1/objects",
-        json=payload
+    if len(_pending_objects) >= WEAVIATE_BATCH_SIZE:
+        flush_vectors()
+    return vid
+
+def flush_vectors():
+    if not _pending_objects:
+        return
+
+    r = _weaviate.post(
+        f"{WEAVIATE['url']}/v1/batch/objects",
+        # float32 vectors serialized straight from numpy
+        data=orjson.dumps(
+            {"objects": _pending_objects},
+            option=orjson.OPT_SERIALIZE_NUMPY
+        ),
+        headers={"Content-Type": "application/json"}
     )
     r.raise_for_status()
-    return vid
+    _pending_objects.clear()
+
+    # The batch call returns 200 even when single objects fail
+    for obj in r.json():
+        errors = (obj.get("result") or {}).get("errors")
+        if errors:
+            raise RuntimeError(f"Weaviate batch insert failed for {obj.get('id')}: {errors}")
 
 def chunk_text(text, size=512):
     words = text.split()
     for i in range(0, len(words), size):
         yield i // size, " ".join(words[i:i+size])
 
+import hashlib, os, shelve
+import orjson
 import psycopg2, requests
-from sentence_transformers import SentenceTransformer
-from config import POSTGRES, WEAVIATE, EMBED_MODEL
+from psycopg2.extras import execute_values
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config import POSTGRES, WEAVIATE, EMBED_MODEL, EMBED_DEVICE, EMBED_ONNX_FILE
+# fp16 on CUDA / int8 ONNX on CPU; importing config already loaded it once
+from config import embedder
+
+# One keep-alive pool for every Weaviate call in this module
+_weaviate = requests.Session()
+_weaviate.mount("http://", HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.2),
+))
 
 db = psycopg2.connect(**POSTGRES)
 db.autocommit = False
 cur = db.cursor()
 
-embedder = SentenceTransformer(EMBED_MODEL)
+EMBED_BATCH = 64
+
+# Cross-run vector cache (shelve file keyed by model + chunk digest); unset to disable
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH")
+# fp16 and int8 variants give slightly different vectors: never mix them
+EMBED_CACHE_NS = f"{EMBED_MODEL}|{EMBED_DEVICE}|{EMBED_ONNX_FILE}"
+
+def embed_unique(chunks):
+    """
+    Encode each distinct chunk text once (boilerplate PRTn content repeats
+    across MPUs) and return vectors in input order.
+    """
+    digests = [hashlib.blake2b(c.encode(), digest_size=16).digest() for c in chunks]
+
+    unique = {}
+    for d, c in zip(digests, chunks):
+        unique.setdefault(d, c)
+
+    vec_by_hash = {}
+    cache = shelve.open(EMBED_CACHE_PATH) if EMBED_CACHE_PATH else None
+    try:
+        if cache is not None:
+            for d in unique:
+                vector = cache.get(f"{EMBED_CACHE_NS}|{d.hex()}")
+                if vector is not None:
+                    vec_by_hash[d] = vector
+
+        misses = [d for d in unique if d not in vec_by_hash]
+        if misses:
+            vectors = embedder.encode(
+                [unique[d] for d in misses],
+                batch_size=EMBED_BATCH,
+                convert_to_numpy=True,
+                show_progress_bar=True,
+            )
+            for d, vector in zip(misses, vectors):
+                vec_by_hash[d] = vector
+                if cache is not None:
+                    cache[f"{EMBED_CACHE_NS}|{d.hex()}"] = vector
+    finally:
+        if cache is not None:
+            cache.close()
+
+    print(f"Embedded {len(misses)} of {len(chunks)} chunks ({len(unique)} distinct)")
+    return [vec_by_hash[d] for d in digests]
 
 from lxml import etree
 
 def parse_xml(xml_path):
-    tree = etree.parse(xml_path)
-    root = tree.getroot()
+    """
+    Stream PRTn policies without building the whole tree. A PRTn is
+    handled on the event after its end tag, once its tail text has been
+    parsed, so tostring() matches a full-tree parse; it is freed after.
+    """
+    project = version = None
+    pending = None
+
+    for event, elem in etree.iterparse(xml_path, events=("start", "end")):
+        if pending is not None:
+            policy = _policy(pending, project, version)
+            if policy is not None:
+                yield policy
 
-    project = root.get("project")
-    version = root.get("version")
+            pending.clear()
+            while pending.getprevious() is not None:
+                del pending.getparent()[0]
+            pending = None
 
-    for mpu in root.findall(".//MPU"):
-        mpu_name = mpu.get("name")
+        if event == "start":
+            # Only the root has no parent: it carries project/version
+            if elem.getparent() is None:
+                project = elem.get("project")
+                version = elem.get("version")
+        elif elem.tag == "PRTn":
+            pending = elem
 
-        for prtn in mpu.findall(".//PRTn"):
-            rg = int(prtn.get("index"))
-            profile = normalize_profile(prtn.get("profile"))
+def _policy(prtn, project, version):
+    mpu = next(prtn.iterancestors("MPU"), None)
+    if mpu is None:
+        return None
 
-            start = int(prtn.get("start"), 16)
-            end   = int(prtn.get("end"), 16)
+    rg = int(prtn.get("index"))
+    profile = normalize_profile(prtn.get("profile"))
 
-            content = etree.tostring(prtn, encoding="unicode")
+    start = int(prtn.get("start"), 16)
+    end   = int(prtn.get("end"), 16)
 
-            yield {
-                "project": project,
-                "mpu": mpu_name,
-                "rg": rg,
-                "profile": profile,
-                "start": start,
-                "end": end,
-                "policy_version": version,
-                "content": content
-            }
+    content = etree.tostring(prtn, encoding="unicode")
+
+    return {
+        "project": project,
+        "mpu": mpu.get("name"),
+        "rg": rg,
+        "profile": profile,
+        "start": start,
+        "end": end,
+        "policy_version": version,
+        "content": content
+    }
 
 def ingest(xml_path):
     print("Parsing:", xml_path)
 
+    # Pass 1: parse + chunk; vectors are computed for the whole file at once
+    items = []
+
     for policy in parse_xml(xml_path):
         meta = {
             "project": policy["project"],
@@ -86,32 +196,51 @@ def ingest(xml_path):
         deactivate_old(identity)
 
         for idx, chunk in chunk_text(policy["content"]):
-            vector_id = insert_vector(chunk, meta)
-
-            row = (
-                meta["project"],
-                meta["mpu"],
-                meta["rg"],
-                meta["profile"],
-                meta["start"],
-                meta["end"],
-                meta["version"],
-                identity,
-                content_h,
-                idx,
-                chunk,
-                vector_id,
-                xml_path
-            )
+            items.append((meta, identity, content_h, idx, chunk))
+
+    # Pass 2: batched forward passes over the distinct, uncached chunks
+    vectors = embed_unique([chunk for *_, chunk in items])
+
+    # Pass 3: Weaviate + Postgres writes
+    rows = []
 
-            insert_chunk(row)
+    for (meta, identity, content_h, idx, chunk), vector in zip(items, vectors):
+        vector_id = insert_vector(chunk, meta, identity, content_h, idx, vector)
 
+        row = (
+            meta["project"],
+            meta["mpu"],
+            meta["rg"],
+            meta["profile"],
+            meta["start"],
+            meta["end"],
+            meta["version"],
+            identity,
+            content_h,
+            idx,
+            chunk,
+            vector_id,
+            xml_path
+        )
+
+        rows.append(row)
+        if len(rows) >= PG_BATCH_SIZE:
+            insert_chunks(rows)
+            rows.clear()
+
+    insert_chunks(rows)
+    flush_vectors()
     db.commit()
     print("✅ Ingestion completed successfully")
 
 
-def insert_chunk(row):
-    cur.execute("""
+PG_BATCH_SIZE = 500
+
+def insert_chunks(rows):
+    # One round-trip per PG_BATCH_SIZE rows; duplicates are skipped
+    if not rows:
+        return
+    execute_values(cur, """
         INSERT INTO policy_chunks (
             project, mpu_name, rg_index, profile,
             start_dec, end_dec,
@@ -119,12 +248,12 @@ def insert_chunk(row):
             identity_hash, content_hash,
             chunk_index, chunk_text,
             vector_id,
-            is_active,
-            xml_path
+            xml_path,
+            is_active
         )
-        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,TRUE,%s)
+        VALUES %s
         ON CONFLICT (identity_hash, chunk_index) DO NOTHING
-    """, row)
+    """, rows, template="(%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,TRUE)", page_size=PG_BATCH_SIZE)
 
 import sys
 
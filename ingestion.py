@@ -1,11 +1,13 @@
 import os
 import glob
+from concurrent.futures import ProcessPoolExecutor
 import uuid
 import hashlib
 from typing import Optional, Dict, Any, List
 
 import psycopg2
 import weaviate
+from psycopg2.extras import execute_values
 from lxml import etree
 
 
@@ -20,48 +22,81 @@ PG_PASSWORD = os.getenv("PG_PASSWORD", "ragpass")
 
 WEAVIATE_URL = os.getenv("WEAVIATE_URL", "http://localhost:8080")
 WEAVIATE_CLASS = "AccessControlPolicy"
+WEAVIATE_BATCH_SIZE = 100
 
 POLICY_VERSION = os.getenv("POLICY_VERSION", "v1.0")
 
+PG_BATCH_SIZE = 500
+
 POLICY_ROOT = "./policies"   # host directory
 
+# Parse/hash processes; DB + Weaviate writes stay in the main process
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", os.cpu_count()))
+
 
 # -----------------------------
 # CONNECTIONS
 # -----------------------------
 
-pg = psycopg2.connect(
-    host=PG_HOST,
-    dbname=PG_DB,
-    user=PG_USER,
-    password=PG_PASSWORD
-)
-pg.autocommit = True
+# Opened by connect() in the main process only: parse workers never
+# touch the databases, and must not open connections on import
+pg = None
+wv = None
+
 
-wv = weaviate.Client(WEAVIATE_URL)
+def connect():
+    global pg, wv
+
+    pg = psycopg2.connect(
+        host=PG_HOST,
+        dbname=PG_DB,
+        user=PG_USER,
+        password=PG_PASSWORD
+    )
+    # One transaction per file, committed by flush_policies()
+    pg.autocommit = False
+
+    wv = weaviate.Client(
+        WEAVIATE_URL,
+        # Keep-alive pool shared by every create/delete/batch call
+        additional_config=weaviate.config.Config(
+            connection_config=weaviate.config.ConnectionConfig(
+                session_pool_connections=8,
+                session_pool_maxsize=32,
+            ),
+        ),
+    )
+    wv.batch.configure(
+        batch_size=WEAVIATE_BATCH_SIZE,
+        dynamic=True,   # client resizes batches from observed server latency
+        callback=check_batch_results,
+    )
 
 
 # -----------------------------
 # UTILS
 # -----------------------------
 
-def sha256(text: str) -> str:
-    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+def sha256_bytes(data: bytes) -> str:
+    # OpenSSL-backed; uses SHA-NI / ARMv8 crypto extensions where present
+    return hashlib.sha256(data).hexdigest()
 
 
 def hex_to_dec(val: Optional[str]):
     if not val:
         return None
     try:
+        # int() parses the 0x prefix itself, in C
         return int(val, 16)
-    except Exception:
+    except ValueError:
         return None
 
 
 def normalize_list(val: Optional[str]):
     if not val:
         return []
-    return [v.strip() for v in val.split(",") if v.strip()]
+    # strip each item once, not once for the filter and again for the value
+    return [v for v in map(str.strip, val.split(",")) if v]
 
 
 # -----------------------------
@@ -79,6 +114,77 @@ def pg_execute(query: str, params: tuple):
     cur.execute(query, params)
 
 
+INSERT_POLICY_SQL = """
+INSERT INTO policy_chunks (
+    chunk_id, project, branch, file_path, policy_version,
+    mpu_name, rg_index, profile,
+    start_dec, end_dec, start_hex, end_hex,
+    rdomains, wdomains, rvmids, wvmids,
+    static, confirmed, enabled,
+    raw_xml, xml_hash,
+    is_active, supersedes_chunk_id,
+    weaviate_object_id
+)
+VALUES %s
+"""
+
+# insert_new_policy rows waiting for write_policies()
+_pending_policies: List[tuple] = []
+
+# Active versions among the buffered rows, which the DB lookup cannot see:
+# (project, mpu_name, rg_index, profile) -> (chunk_id, xml_hash)
+_pending_active: Dict[tuple, tuple] = {}
+
+# Superseded chunk_ids, deactivated right after the buffered inserts
+_pending_deactivations: List[str] = []
+
+# Superseded vectors, deleted once the file's transaction has committed
+_stale_vectors: List[str] = []
+
+
+def active_key(project: str, mpu_name: str, rg_index: int, profile: Optional[str]):
+    return (project, mpu_name, rg_index, profile or "")
+
+
+def write_policies():
+    """
+    Send buffered inserts and deactivations inside the open transaction.
+    Written rows are visible to later lookups on the same connection.
+    """
+    cur = pg.cursor()
+    if _pending_policies:
+        execute_values(
+            cur, INSERT_POLICY_SQL, _pending_policies, page_size=PG_BATCH_SIZE
+        )
+    if _pending_deactivations:
+        cur.execute(
+            "UPDATE policy_chunks SET is_active=false WHERE chunk_id = ANY(%s)",
+            (_pending_deactivations,)
+        )
+    _pending_policies.clear()
+    _pending_active.clear()
+    _pending_deactivations.clear()
+
+
+def flush_policies():
+    """
+    Commit one file: new vectors, then the Postgres rows and
+    deactivations atomically, then drop the superseded vectors.
+    The old version stays active until its replacement is committed.
+    """
+    try:
+        write_policies()
+        wv.batch.flush()
+        pg.commit()
+    except Exception:
+        pg.rollback()
+        raise
+
+    for chunk_id in _stale_vectors:
+        delete_weaviate_vector(chunk_id)
+    _stale_vectors.clear()
+
+
 # -----------------------------
 # WEAVIATE HELPERS
 # -----------------------------
@@ -91,8 +197,17 @@ def delete_weaviate_vector(chunk_id: str):
         pass
 
 
+def check_batch_results(results):
+    # Batch requests succeed as a whole even when single objects fail
+    for result in results or []:
+        errors = (result.get("result") or {}).get("errors")
+        if errors:
+            print(f"    ❌ Weaviate insert failed for {result.get('id')}: {errors}")
+
+
 def insert_weaviate_vector(chunk_id: str, obj: Dict[str, Any]):
-    wv.data_object.create(
+    # Queued; sent every WEAVIATE_BATCH_SIZE objects and on flush
+    wv.batch.add_data_object(
         data_object=obj,
         class_name=WEAVIATE_CLASS,
         uuid=chunk_id
@@ -104,6 +219,9 @@ def insert_weaviate_vector(chunk_id: str, obj: Dict[str, Any]):
 # -----------------------------
 
 def parse_prtn(node: etree._Element) -> Dict[str, Any]:
+    # Hash the serialized bytes directly; no decode -> encode round-trip
+    raw_xml = etree.tostring(node, pretty_print=True)
+
     return {
         "rg_index": int(node.get("index")),
         "profile": node.get("profile"),
@@ -116,22 +234,50 @@ def parse_prtn(node: etree._Element) -> Dict[str, Any]:
         "wdomains": normalize_list(node.get("wdomains")),
         "rvmids": normalize_list(node.get("rvmids")),
         "wvmids": normalize_list(node.get("wvmids")),
-        "raw_xml": etree.tostring(node, pretty_print=True).decode(),
+        "raw_xml": raw_xml.decode(),
+        "xml_hash": sha256_bytes(raw_xml),
     }
 
 
+def iter_prtn(xml_file: str):
+    """
+    Stream (root, PRTn) pairs without building the whole tree.
+    Each PRTn is yielded on the event after its end tag, once its tail
+    text is parsed (raw_xml / xml_hash match a full-tree parse), and
+    freed together with its already-processed siblings afterwards.
+    """
+    root = None
+    pending = None
+
+    for event, elem in etree.iterparse(xml_file, events=("start", "end")):
+        if root is None:
+            root = elem
+
+        if pending is not None:
+            yield root, pending
+
+            pending.clear()
+            while pending.getprevious() is not None:
+                del pending.getparent()[0]
+            pending = None
+
+        if event == "end" and elem.tag == "PRTn":
+            pending = elem
+
+
 # -----------------------------
 # CORE INGESTION LOGIC
 # -----------------------------
 
 def ingest_prtn(project: str, mpu_name: str, prtn: Dict[str, Any]):
 
-    xml_hash = sha256(prtn["raw_xml"])
+    xml_hash = prtn["xml_hash"]
     rg_index = prtn["rg_index"]
     profile  = prtn["profile"]
 
-    # 1️⃣ Look up active logical policy
-    row = pg_fetch_one(
+    # 1️⃣ Look up active logical policy (buffered rows first)
+    key = active_key(project, mpu_name, rg_index, profile)
+    row = _pending_active.get(key) or pg_fetch_one(
         """
         SELECT chunk_id, xml_hash
         FROM policy_chunks
@@ -150,6 +296,7 @@ def ingest_prtn(project: str, mpu_name: str, prtn: Dict[str, Any]):
     if not row:
         new_chunk_id = str(uuid.uuid4())
         insert_new_policy(project, mpu_name, prtn, xml_hash, new_chunk_id)
+        _pending_active[key] = (new_chunk_id, xml_hash)
         print(f"    ✅ Inserted RG {rg_index} (ACTIVE)")
         return
 
@@ -167,18 +314,16 @@ def ingest_prtn(project: str, mpu_name: str, prtn: Dict[str, Any]):
     # -----------------------------
     print(f"    ♻️  Updated RG {rg_index}")
 
-    pg_execute(
-        "UPDATE policy_chunks SET is_active=false WHERE chunk_id=%s",
-        (old_chunk_id,)
-    )
-
-    delete_weaviate_vector(old_chunk_id)
+    # Applied by flush_policies(), together with the replacement row
+    _pending_deactivations.append(old_chunk_id)
+    _stale_vectors.append(old_chunk_id)
 
     new_chunk_id = str(uuid.uuid4())
     insert_new_policy(
         project, mpu_name, prtn, xml_hash, new_chunk_id,
         supersedes=old_chunk_id
     )
+    _pending_active[key] = (new_chunk_id, xml_hash)
 
 
 def insert_new_policy(
@@ -192,27 +337,8 @@ def insert_new_policy(
     start_dec = hex_to_dec(prtn["start_hex"])
     end_dec   = hex_to_dec(prtn["end_hex"])
 
-    pg_execute(
-        """
-        INSERT INTO policy_chunks (
-            chunk_id, project, branch, file_path, policy_version,
-            mpu_name, rg_index, profile,
-            start_dec, end_dec, start_hex, end_hex,
-            rdomains, wdomains, rvmids, wvmids,
-            static, confirmed, enabled,
-            raw_xml, xml_hash,
-            is_active, supersedes_chunk_id,
-            weaviate_object_id
-        )
-        VALUES (%s,%s,%s,%s,%s,
-                %s,%s,%s,
-                %s,%s,%s,%s,
-                %s,%s,%s,%s,
-                %s,%s,%s,
-                %s,%s,
-                true,%s,
-                %s)
-        """,
+    # Buffered: written by write_policies() in PG_BATCH_SIZE pages
+    _pending_policies.append(
         (
             chunk_id,
             project,
@@ -235,10 +361,13 @@ def insert_new_policy(
             True,
             prtn["raw_xml"],
             xml_hash,
+            True,
             supersedes,
             chunk_id,    # same ID for Weaviate
         )
     )
+    if len(_pending_policies) >= PG_BATCH_SIZE:
+        write_policies()
 
     chunk_text = (
         f"MPU: {mpu_name}\n"
@@ -267,33 +396,50 @@ def insert_new_policy(
 # PROJECT-LEVEL INGESTION
 # -----------------------------
 
-def ingest_project(project_dir: str):
+def parse_file(xml_file: str) -> List[tuple]:
+    """
+    Worker-side: parse and hash every PRTn of one XML file.
+    Returns (mpu_name, prtn) pairs; no database access.
+    """
+    parsed = []
+
+    for root, prtn_node in iter_prtn(xml_file):
+        # MPU name is usually in parent node or attribute
+        mpu_name = root.get("name") or root.tag
+        parsed.append((mpu_name, parse_prtn(prtn_node)))
+
+    return parsed
+
+
+def ingest_project(project_dir: str, pool: ProcessPoolExecutor):
     project = os.path.basename(project_dir)
 
     print(f"\n[+] Project: {project}")
 
-    for xml_file in glob.glob(os.path.join(project_dir, "*.xml")):
-        print(f"    -> Parsing {xml_file}")
-
-        tree = etree.parse(xml_file)
-        root = tree.getroot()
+    xml_files = glob.glob(os.path.join(project_dir, "*.xml"))
 
-        # MPU name is usually in parent node or attribute
-        mpu_name = root.get("name") or root.tag
+    # Files parse in parallel; results arrive in order to the single writer
+    for xml_file, parsed in zip(xml_files, pool.map(parse_file, xml_files)):
+        print(f"    -> Parsing {xml_file}")
 
-        for prtn_node in root.findall(".//PRTn"):
-            prtn = parse_prtn(prtn_node)
+        for mpu_name, prtn in parsed:
             ingest_prtn(project, mpu_name, prtn)
 
+        # One MPU per file: commit its rows and vectors before moving on
+        flush_policies()
+
 
 # -----------------------------
 # MAIN
 # -----------------------------
 
 def main():
-    for project_dir in glob.glob(os.path.join(POLICY_ROOT, "*")):
-        if os.path.isdir(project_dir):
-            ingest_project(project_dir)
+    connect()
+
+    with ProcessPoolExecutor(max_workers=INGEST_WORKERS) as pool:
+        for project_dir in glob.glob(os.path.join(POLICY_ROOT, "*")):
+            if os.path.isdir(project_dir):
+                ingest_project(project_dir, pool)
 
     print("\n✅ Ingestion completed successfully")
 
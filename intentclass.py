@@ -9,61 +9,77 @@ class Route(str, Enum):
     LLM = "LLM"
 
 
-@dataclass
+@dataclass(frozen=True)
 class IntentDecision:
     route: Route
     reason: str
     confidence: float
 
 
+# classify() has three possible outcomes; share one immutable instance each
+_LLM_EXPLAIN = IntentDecision(
+    route=Route.LLM,
+    reason="Conceptual / explanatory query",
+    confidence=0.95
+)
+_TAG_LOOKUP = IntentDecision(
+    route=Route.TAG,
+    reason="Concrete selector + lookup intent",
+    confidence=0.98
+)
+_LLM_FALLBACK = IntentDecision(
+    route=Route.LLM,
+    reason="No deterministic lookup signal",
+    confidence=0.90
+)
+
+
 class ProductionIntentClassifier:
 
     ADDRESS_REGEX = re.compile(r"0x[0-9a-fA-F]+")
     RANGE_REGEX = re.compile(r"0x[0-9a-fA-F]+\s*[-–]\s*0x[0-9a-fA-F]+")
     REGION_REGEX = re.compile(r"\bregion\s+\d+\b")
 
-    LOOKUP_VERBS = {
+    LOOKUP_VERBS = frozenset({
         "get", "give", "fetch", "show", "find",
         "list", "details", "access", "permissions"
-    }
+    })
 
-    EXPLAIN_VERBS = {
+    EXPLAIN_VERBS = frozenset({
         "explain", "design", "architecture",
         "overview", "how", "why", "compare",
         "what is", "describe"
-    }
+    })
+
+    # One scan per signal. A range always contains an address, so
+    # address|region covers all three selector patterns above.
+    # Verbs match as words ("show" no longer hits "how"), inflections
+    # included ("shows", "fetched", "accessible", "compared").
+    VERB_SUFFIX = r"(?:s|es|d|ed|ing|ible)?"
+
+    SELECTOR_RE = re.compile(r"0x[0-9a-f]+|\bregion\s+\d+\b")
+    LOOKUP_RE = re.compile(
+        r"\b(?:" + "|".join(sorted(LOOKUP_VERBS)) + ")" + VERB_SUFFIX + r"\b"
+    )
+    EXPLAIN_RE = re.compile(
+        r"\b(?:" + "|".join(v.replace(" ", r"\s+") for v in sorted(EXPLAIN_VERBS)) + ")"
+        + VERB_SUFFIX + r"\b"
+    )
 
     def classify(self, query: str) -> IntentDecision:
         q = query.lower()
 
-        has_address = bool(
-            self.ADDRESS_REGEX.search(q) or
-            self.RANGE_REGEX.search(q) or
-            self.REGION_REGEX.search(q)
-        )
-
-        has_lookup = any(v in q for v in self.LOOKUP_VERBS)
-        has_explain = any(v in q for v in self.EXPLAIN_VERBS)
+        has_address = self.SELECTOR_RE.search(q) is not None
+        has_lookup = self.LOOKUP_RE.search(q) is not None
+        has_explain = self.EXPLAIN_RE.search(q) is not None
 
         # ---- Gate 2: Force LLM ----
         if has_explain:
-            return IntentDecision(
-                route=Route.LLM,
-                reason="Conceptual / explanatory query",
-                confidence=0.95
-            )
+            return _LLM_EXPLAIN
 
         # ---- Gate 1: Strict TAG ----
         if has_address and has_lookup:
-            return IntentDecision(
-                route=Route.TAG,
-                reason="Concrete selector + lookup intent",
-                confidence=0.98
-            )
+            return _TAG_LOOKUP
 
         # ---- Gate 3: Ambiguous → LLM ----
-        return IntentDecision(
-            route=Route.LLM,
-            reason="No deterministic lookup signal",
-            confidence=0.90
-        )
\ No newline at end of file
+        return _LLM_FALLBACK
\ No newline at end of file
@@ -1,5 +1,8 @@
-import requests
 import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from token_manager import TokenManager
 
 class IPCatalogClient:
@@ -7,32 +10,62 @@ class IPCatalogClient:
     Thin API client with retry + backoff.
     """
 
-    def __init__(self, base_url, token_manager):
+    # Re-ask the token manager this long before the cached token expires
+    TOKEN_SKEW = 30
+
+    def __init__(self, base_url, token_manager, retries=3, token_ttl=3600):
         self.base_url = base_url.rstrip("/")
         self.token_manager = token_manager
 
+        # Keep-alive pool; urllib3 owns backoff for transient 5xx / connect errors
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(
+            pool_connections=8,
+            pool_maxsize=32,
+            max_retries=Retry(
+                total=retries,
+                backoff_factor=1,
+                status_forcelist=[502, 503, 504],
+                allowed_methods=frozenset(["GET", "POST"]),
+                raise_on_status=False,
+            ),
+        ))
+
+        self.token_ttl = token_ttl
+        self._token = None
+        self._token_expiry = 0.0
+        self._headers_cache = {"Accept": "application/json"}
+
     def _headers(self):
-        return {
-            "Authorization": f"Bearer {self.token_manager.get_token()}",
-            "Accept": "application/json"
-        }
+        # The token manager is consulted once per token lifetime, not per call
+        now = time.monotonic()
+        if now >= self._token_expiry - self.TOKEN_SKEW:
+            token = self.token_manager.get_token()
+            self._token_expiry = now + self.token_ttl
+            if token != self._token:
+                self._token = token
+                self._headers_cache["Authorization"] = f"Bearer {token}"
+        return self._headers_cache
 
-    def request(self, method, path, retries=3):
+    def request(self, method, path):
         url = f"{self.base_url}{path}"
-        for attempt in range(retries):
-            resp = requests.request(
+        resp = self._session.request(
+            method,
+            url,
+            headers=self._headers(),
+            timeout=30
+        )
+        if resp.status_code == 401:
+            self._token_expiry = 0.0
+            self.token_manager._refresh()
+            resp = self._session.request(
                 method,
                 url,
                 headers=self._headers(),
                 timeout=30
             )
-            if resp.status_code == 401:
-                self.token_manager._refresh()
-                continue
-            if resp.ok:
-                return resp.json()
-            time.sleep(2 ** attempt)
         resp.raise_for_status()
+        return resp.json()
 
     def list_chips(self):
         return self.request("GET", "/chip/")
@@ -47,4 +80,4 @@ class IPCatalogClient:
         return self.request(
             "POST",
             f"/xpu/policy/{policy_id}/export"
-        )
\ No newline at end of file
+        )
@@ -1,3 +1,5 @@
+import asyncio
+from functools import lru_cache
 from typing import List, Dict, Any, Optional
 from rag.db.psql import SQLQueryEngine
 from rag.db.vectors import VectorRepo
@@ -5,6 +7,12 @@ from rag.db.policy_classifier import classify_policy
 from rag.llm.llm_client import LLMClient
 
 
+# classify_policy is pure; the same policy rows come back across queries
+# (and across plan retries), so classify each (start, end, profile) once.
+# Callers only read the returned dict (r.update copies it).
+_classify_policy = lru_cache(maxsize=4096)(classify_policy)
+
+
 class Executor:
     """
     Executes planner-generated plans deterministically.
@@ -15,35 +23,98 @@ class Executor:
         self.vector = vector
         self.llm = llm
 
-        # execution memory
-        self.results: Dict[int, Any] = {}
+        # No per-run state on the instance: execution memory is local to
+        # each run()/arun() call, so one Executor can serve concurrent runs
 
     # -------------------------------------------------
     # Main entry
     # -------------------------------------------------
 
     def run(self, plan: List[Dict]) -> List[Dict]:
+        # execution memory, indexed by plan step
+        results: List[Any] = [None] * len(plan)
+        nonempty: List[int] = []  # steps that returned rows, in order
+
         for idx, step in enumerate(plan):
             action = step["action"]
 
             # dependency check
-            if not self._deps_satisfied(step):
+            if not self._deps_satisfied(results, step):
                 continue
 
             if action == "SQL_SEARCH":
-                self.results[idx] = self._sql_search(step["params"])
+                self._record(results, nonempty, idx, self._sql_search(step["params"]))
 
             elif action == "VECTOR_SEARCH":
-                self.results[idx] = self._vector_search(step["params"])
+                self._record(
+                    results, nonempty, idx,
+                    self._vector_search(step["params"], nonempty)
+                )
 
             elif action == "CLARIFY":
-                self.results[idx] = step["params"]
+                self._record(results, nonempty, idx, step["params"])
                 break
 
             else:
                 raise ValueError(f"Unknown planner action: {action}")
 
-        return self._final_result()
+        return self._final_result(results, nonempty)
+
+    async def arun(self, plan: List[Dict]) -> List[Dict]:
+        """
+        Async run(): every search step starts at once, so an SQL -> vector
+        fallback costs max(sql, vector) instead of sql + vector. A vector
+        result is dropped (and no longer awaited) when an earlier step
+        returned rows, exactly as run() would have skipped it.
+        """
+        results: List[Any] = [None] * len(plan)
+        nonempty: List[int] = []
+        tasks: Dict[int, asyncio.Task] = {}
+        clarify: Optional[int] = None
+
+        try:
+            for idx, step in enumerate(plan):
+                action = step["action"]
+
+                # dependency check (a started step counts as run)
+                if not self._deps_satisfied(results, step, started=tasks):
+                    continue
+
+                if action == "SQL_SEARCH":
+                    handler = self._sql_search
+
+                elif action == "VECTOR_SEARCH":
+                    handler = self._semantic_search
+
+                elif action == "CLARIFY":
+                    clarify = idx
+                    break
+
+                else:
+                    raise ValueError(f"Unknown planner action: {action}")
+
+                tasks[idx] = asyncio.create_task(
+                    asyncio.to_thread(handler, step["params"])
+                )
+
+            # Collect in plan order: SQL wins whenever it has rows
+            for idx, task in tasks.items():
+                if plan[idx]["action"] == "VECTOR_SEARCH" and self._has_prior_results(nonempty):
+                    self._record(results, nonempty, idx, [])
+                else:
+                    self._record(results, nonempty, idx, await task)
+
+        finally:
+            for task in tasks.values():
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()  # mark discarded failures as retrieved
+
+        if clarify is not None:
+            self._record(results, nonempty, clarify, plan[clarify]["params"])
+
+        return self._final_result(results, nonempty)
 
     # -------------------------------------------------
     # Action handlers
@@ -52,24 +123,23 @@ class Executor:
     def _sql_search(self, params: Dict) -> List[Dict]:
         rows = self.sql.fetch_policies(params)
 
-        # classify policies (pure function)
+        # classify policies (pure function, memoized)
+        classify = _classify_policy
         for r in rows:
-            cls = classify_policy(
-                r["addr_start"],
-                r["addr_end"],
-                r["profile"]
-            )
-            r.update(cls)
+            r.update(classify(r["addr_start"], r["addr_end"], r["profile"]))
 
         return rows
 
-    def _vector_search(self, params: Dict) -> List[Dict]:
+    def _vector_search(self, params: Dict, nonempty: List[int]) -> List[Dict]:
         """
         Vector search ONLY runs if prior SQL result is empty.
         """
-        if self._has_prior_results():
+        if self._has_prior_results(nonempty):
             return []
 
+        return self._semantic_search(params)
+
+    def _semantic_search(self, params: Dict) -> List[Dict]:
         return self.vector.semantic_search(
             query_text=params["semantic_query"],
             filters=params,
@@ -80,23 +150,30 @@ class Executor:
     # Helpers
     # -------------------------------------------------
 
-    def _deps_satisfied(self, step: Dict) -> bool:
+    @staticmethod
+    def _record(results: List[Any], nonempty: List[int], idx: int, res: Any) -> None:
+        results[idx] = res
+        if isinstance(res, list) and res:
+            nonempty.append(idx)
+
+    @staticmethod
+    def _deps_satisfied(results: List[Any], step: Dict, started=()) -> bool:
+        """
+        A step runs once every dependency has run; an empty result
+        still counts (empty SQL → allow fallback). Skipped → skip.
+        """
         for dep in step.get("depends_on", []):
-            if not self.results.get(dep):
-                return True  # empty SQL → allow fallback
+            if results[dep] is None and dep not in started:
+                return False
         return True
 
-    def _has_prior_results(self) -> bool:
-        for res in self.results.values():
-            if isinstance(res, list) and res:
-                return True
-        return False
+    @staticmethod
+    def _has_prior_results(nonempty: List[int]) -> bool:
+        return bool(nonempty)
 
-    def _final_result(self) -> List[Dict]:
+    @staticmethod
+    def _final_result(results: List[Any], nonempty: List[int]) -> List[Dict]:
         """
         Return the first non-empty result set.
         """
-        for res in self.results.values():
-            if isinstance(res, list) and res:
-                return res
-        return []
\ No newline at end of file
+        return results[nonempty[0]] if nonempty else []
\ No newline at end of file
@@ -6,7 +6,7 @@ from dataclasses import dataclass
 # QueryFacts contract (import if already defined)
 # -------------------------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class QueryFacts:
     intent: Optional[str]               # ADDRESS_LOOKUP | POLICY_LOOKUP | PROFILE_LOOKUP
     project: Optional[str]
@@ -126,27 +126,17 @@ class Planner:
         Build a safe semantic hint for vector search.
         This must never invent data.
         """
-        parts = []
-
-        if facts.project:
-            parts.append(f"project {facts.project}")
-
-        if facts.mpu_name:
-            parts.append(f"MPU {facts.mpu_name}")
-
-        if facts.profile:
-            parts.append(f"profile {facts.profile}")
-
-        if facts.intent:
-            parts.append(facts.intent.lower().replace("_", " "))
-
-        if facts.domains:
-            parts.append("domains " + ", ".join(facts.domains))
-
-        if facts.wdomains:
-            parts.append("write domains " + ", ".join(facts.wdomains))
-
-        return " ".join(parts)
+        # Each part is built only when its field is set; falsy parts drop out
+        parts = (
+            facts.project and f"project {facts.project}",
+            facts.mpu_name and f"MPU {facts.mpu_name}",
+            facts.profile and f"profile {facts.profile}",
+            facts.intent and facts.intent.lower().replace("_", " "),
+            facts.domains and f"domains {', '.join(facts.domains)}",
+            facts.wdomains and f"write domains {', '.join(facts.wdomains)}",
+        )
+
+        return " ".join(p for p in parts if p)
 
     def _clarify(self, reason: str) -> Dict:
         """
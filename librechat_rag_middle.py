@@ -5,16 +5,34 @@ Always calls POST /query
 """
 
 import re
-import requests
+from contextlib import asynccontextmanager
 from typing import Optional, Dict, Any, List
+
+import httpx
 from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 
 RAG_QUERY_URL = "http://localhost:9000/query"
 LIBRECHAT_API_URL = "http://localhost:3080/api/chat"
 DEFAULT_PROJECT = "AMBOSELI"
 
-app = FastAPI(title="LibreChat Unified RAG Middleware")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One keep-alive pool per worker: RAG and LLM calls reuse connections
+    app.state.http = httpx.AsyncClient(
+        limits=httpx.Limits(max_keepalive_connections=32, max_connections=64)
+    )
+
+    yield
+
+    await app.state.http.aclose()
+
+
+app = FastAPI(title="LibreChat Unified RAG Middleware", lifespan=lifespan)
 
 
 class ChatRequest(BaseModel):
@@ -24,16 +42,20 @@ class ChatRequest(BaseModel):
     profile: Optional[str] = None
     limit: int = 5
     session_id: Optional[str] = None
+    stream: bool = False   # opt-in: SSE passthrough instead of the JSON body
 
 
-HEX_PATTERN = re.compile(r"0x[0-9A-Fa-f]+")
+HEX_PATTERN = re.compile(r"0x[0-9A-Fa-f]+", re.ASCII)
 
 
 def extract_address_range(text: str):
-    matches = HEX_PATTERN.findall(text)
-    if len(matches) >= 2:
-        return {"start_hex": matches[0], "end_hex": matches[1]}
-    return None
+    # Only the first two hex tokens matter; stop scanning once both are found
+    it = HEX_PATTERN.finditer(text)
+    start = next(it, None)
+    end = next(it, None)
+    if end is None:
+        return None
+    return {"start_hex": start.group(), "end_hex": end.group()}
 
 
 def build_context(results: List[Dict[str, Any]]) -> str:
@@ -61,8 +83,39 @@ USER QUESTION
 """.strip()
 
 
+async def stream_llm(
+    http: httpx.AsyncClient,
+    libre_payload: Dict[str, Any],
+    rag_data: Dict[str, Any],
+) -> StreamingResponse:
+    """
+    Forward the LLM output as it is generated instead of waiting for
+    the full completion. RAG metadata travels in response headers.
+    """
+    llm_req = http.build_request(
+        "POST", LIBRECHAT_API_URL, json=libre_payload, timeout=60
+    )
+    llm_resp = await http.send(llm_req, stream=True)
+
+    try:
+        llm_resp.raise_for_status()
+    except httpx.HTTPStatusError:
+        await llm_resp.aclose()
+        raise
+
+    return StreamingResponse(
+        llm_resp.aiter_raw(),
+        media_type=llm_resp.headers.get("content-type", "text/event-stream"),
+        headers={
+            "X-RAG-Mode": str(rag_data.get("mode")),
+            "X-RAG-Hits": str(rag_data.get("hit_count")),
+        },
+        background=BackgroundTask(llm_resp.aclose),
+    )
+
+
 @app.post("/chat")
-def chat(req: ChatRequest):
+async def chat(req: ChatRequest):
     project = req.project or DEFAULT_PROJECT
 
     addr = extract_address_range(req.user_query)
@@ -86,7 +139,9 @@ def chat(req: ChatRequest):
         if req.profile:
             payload["profile"] = req.profile
 
-    rag_resp = requests.post(RAG_QUERY_URL, json=payload, timeout=30)
+    http: httpx.AsyncClient = app.state.http
+
+    rag_resp = await http.post(RAG_QUERY_URL, json=payload, timeout=30)
     rag_resp.raise_for_status()
     rag_data = rag_resp.json()
 
@@ -100,7 +155,13 @@ def chat(req: ChatRequest):
         "session_id": req.session_id,
     }
 
-    llm_resp = requests.post(LIBRECHAT_API_URL, json=libre_payload, timeout=60)
+    if req.stream:
+        # Ask LibreChat for server-sent events and relay them as they arrive
+        libre_payload["stream"] = True
+        return await stream_llm(http, libre_payload, rag_data)
+
+    # Serial on purpose: the LLM prompt needs the RAG context
+    llm_resp = await http.post(LIBRECHAT_API_URL, json=libre_payload, timeout=60)
     llm_resp.raise_for_status()
 
     return {
@@ -1,4 +1,4 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator
 from llama_index.core import TextNode
 from llama_index.core.response_synthesizers import get_response_synthesizer
 from llama_index.core.schema import NodeWithScore
@@ -40,17 +40,45 @@ class LlamaIndexAdapter:
         LLM is only allowed to format + explain nodes.
         """
 
-        node_scores = [NodeWithScore(node=n, score=1.0) for n in nodes]
+        synthesizer = self._synthesizer(kshots, mode)
 
-        synthesizer = get_response_synthesizer(
-            llm=self.llm,
-            response_mode=mode,
-            system_prompt=kshots,
+        response = synthesizer.synthesize(
+            query=query,
+            nodes=self._score(nodes),
         )
 
-        response = synthesizer.synthesize(
+        return str(response)
+
+    async def astream(
+        self,
+        query: str,
+        nodes: List[TextNode],
+        kshots: str | None = None,
+        mode: str = "compact"
+    ) -> AsyncIterator[str]:
+        """
+        Streaming synthesize(): yields text deltas as the LLM produces
+        them, so callers can forward the first tokens immediately.
+        """
+
+        synthesizer = self._synthesizer(kshots, mode, streaming=True)
+
+        response = await synthesizer.asynthesize(
             query=query,
-            nodes=node_scores,
+            nodes=self._score(nodes),
+        )
+
+        async for chunk in response.async_response_gen():
+            yield chunk
+
+    def _synthesizer(self, kshots: str | None, mode: str, streaming: bool = False):
+        return get_response_synthesizer(
+            llm=self.llm,
+            response_mode=mode,
+            system_prompt=kshots,
+            streaming=streaming,
         )
 
-        return str(response)
\ No newline at end of file
+    @staticmethod
+    def _score(nodes: List[TextNode]) -> List[NodeWithScore]:
+        return [NodeWithScore(node=n, score=1.0) for n in nodes]
\ No newline at end of file
@@ -1,14 +1,39 @@
 # app/main.py
 
+import os
+
 import uvicorn
 from app.api import app
 
 
+# Cores local to the NIC's NUMA node, e.g. "0-7" or "0,2,4,6"
+CPU_AFFINITY = os.getenv("API_CPU_AFFINITY")
+WORKERS = int(os.getenv("API_WORKERS", 1))
+
+
+def parse_cpu_list(spec: str) -> set:
+    cpus = set()
+    for part in spec.split(","):
+        if "-" in part:
+            lo, hi = part.split("-")
+            cpus.update(range(int(lo), int(hi) + 1))
+        elif part:
+            cpus.add(int(part))
+    return cpus
+
+
 if __name__ == "__main__":
+    # Workers inherit the parent's affinity (same effect as taskset -c)
+    if CPU_AFFINITY:
+        os.sched_setaffinity(0, parse_cpu_list(CPU_AFFINITY))
+
     uvicorn.run(
         "app.api:app",
         host="0.0.0.0",
         port=8000,
+        workers=WORKERS,
+        loop="uvloop",
+        http="httptools",
         reload=False,
         log_level="info",
-    )
\ No newline at end of file
+    )
@@ -1,6 +1,13 @@
+import sys
 from dataclasses import dataclass
 from typing import Optional
 
+
+def intern_str(value: Optional[str]) -> Optional[str]:
+    # project / mpu_name / profile have tiny cardinality: share one str per value
+    return sys.intern(value) if value is not None else None
+
+
 @dataclass(frozen=True)
 class Chunk:
     chunk_id: int
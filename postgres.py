@@ -3,15 +3,39 @@ import psycopg2.extras
 from psycopg2.pool import SimpleConnectionPool
 from contextlib import contextmanager
 import os
+import weakref
+
+
+# Per worker; opened in the app lifespan so the first request finds warm connections
+PG_POOL_MIN = int(os.getenv("PG_POOL_MIN", 4))
+PG_POOL_MAX = int(os.getenv("PG_POOL_MAX", 16))
+
+
+# Server-side prepared once per pooled connection (see _prepare_insert)
+INSERT_CHUNK_PREPARE = """
+PREPARE ins_chunk AS
+INSERT INTO policy_chunks (
+    project, version, mpu_name, rg_index, profile,
+    start_hex, end_hex,
+    chunk_index, chunk_text
+)
+VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+ON CONFLICT DO NOTHING
+RETURNING id
+"""
 
 
 class PostgresDriver:
     def __init__(self):
         self.pool = SimpleConnectionPool(
-            minconn=1,
-            maxconn=10,  # scale with load
+            minconn=PG_POOL_MIN,
+            maxconn=PG_POOL_MAX,  # scale with load
             dsn=os.environ["PG_DSN"],
         )
+        self._prepared = weakref.WeakSet()
+
+    def close(self):
+        self.pool.closeall()
 
     @contextmanager
     def cursor(self):
@@ -26,25 +50,26 @@ class PostgresDriver:
         finally:
             self.pool.putconn(conn)
 
+    def _prepare_insert(self, cur):
+        # Prepared statements are per session, so track connections
+        conn = cur.connection
+        if conn not in self._prepared:
+            cur.execute(INSERT_CHUNK_PREPARE)
+            self._prepared.add(conn)
+
     # --------- writes ---------
 
     def insert_chunk(self, chunk: dict) -> int:
         sql = """
-        INSERT INTO policy_chunks (
-            project, version, mpu_name, rg_index, profile,
-            start_hex, end_hex,
-            chunk_index, chunk_text
-        )
-        VALUES (
+        EXECUTE ins_chunk (
             %(project)s, %(version)s, %(mpu_name)s, %(rg_index)s, %(profile)s,
             %(start_hex)s, %(end_hex)s,
             %(chunk_index)s, %(chunk_text)s
         )
-        ON CONFLICT DO NOTHING
-        RETURNING id
         """
 
         with self.cursor() as cur:
+            self._prepare_insert(cur)
             cur.execute(sql, chunk)
             row = cur.fetchone()
             return row["id"] if row else None
@@ -67,7 +92,12 @@ class PostgresDriver:
             params[k] = v
 
         where = " AND ".join(clauses)
-        sql = f"SELECT * FROM policy_chunks WHERE {where}"
+        # Only the columns StructuredSearcher / PromptBuilder render
+        sql = (
+            "SELECT id, project, version, mpu_name, rg_index, profile, "
+            "start_hex, end_hex, chunk_text "
+            f"FROM policy_chunks WHERE {where}"
+        )
 
         with self.cursor() as cur:
             cur.execute(sql, params)
@@ -0,0 +1,69 @@
+# rag/response_cache.py
+import hashlib
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.redis import RedisBackend
+from redis.asyncio import Redis
+
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+CACHE_PREFIX = "rag-cache"
+CACHE_EXPIRE = int(os.getenv("RAG_CACHE_TTL_SECONDS", 600))
+
+
+def init_response_cache() -> Redis:
+    """
+    Call once from the app lifespan; returns the client so it can be closed.
+    """
+    redis = Redis.from_url(REDIS_URL)
+    FastAPICache.init(RedisBackend(redis), prefix=CACHE_PREFIX, expire=CACHE_EXPIRE)
+    return redis
+
+
+def response_cache_key(query: str, filters: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Normalised query text plus any filters that change the answer.
+    """
+    raw = query.strip().lower()
+    if filters:
+        raw += "|" + json.dumps(filters, sort_keys=True)
+
+    digest = hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+    return f"{FastAPICache.get_prefix()}:{digest}"
+
+
+async def cached_response(
+    request: Request,
+    response: Response,
+    key: str,
+    compute: Callable[[], Awaitable[Any]],
+) -> Any:
+    """
+    Serve a JSON result from Redis, computing and storing it on a miss.
+
+    fastapi-cache's @cache only covers GET, so the POST endpoints use
+    its backend directly. ?nocache=1 bypasses the cache for debugging.
+    """
+    if request.query_params.get("nocache") == "1":
+        response.headers["Cache-Control"] = "no-store"
+        return await compute()
+
+    backend = FastAPICache.get_backend()
+
+    hit = await backend.get(key)
+    if hit is not None:
+        response.headers["X-Cache"] = "HIT"
+        response.headers["Cache-Control"] = f"max-age={CACHE_EXPIRE}"
+        return json.loads(hit)
+
+    result = jsonable_encoder(await compute())
+    await backend.set(key, json.dumps(result).encode("utf-8"), expire=CACHE_EXPIRE)
+
+    response.headers["X-Cache"] = "MISS"
+    response.headers["Cache-Control"] = f"max-age={CACHE_EXPIRE}"
+    return result
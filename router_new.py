@@ -1,3 +1,5 @@
+import asyncio
+
 from app.rag.structured_search import StructuredSearcher
 from app.rag.semantic_search import SemanticSearcher
 from app.rag.chunk_merger import ChunkMerger
@@ -7,8 +9,24 @@ class RAGRouter:
         self.structured = StructuredSearcher(pg)
         self.semantic = SemanticSearcher(weaviate, embedder)
 
-    def retrieve_chunks(self, query: str, filters: dict):
-        structured_chunks = self.structured.search(filters)
-        semantic_chunks = self.semantic.search(query)
+    async def retrieve_chunks(self, query: str, filters: dict):
+        structured_chunks, semantic_chunks = await asyncio.gather(
+            asyncio.to_thread(self.structured.search, filters),
+            asyncio.to_thread(self.semantic.search, query),
+        )
+
+        return ChunkMerger.merge(structured_chunks, semantic_chunks)
+
+    async def retrieve_chunks_batch(self, queries: list, filters_list: list):
+        structured_batches, semantic_batches = await asyncio.gather(
+            asyncio.gather(*(
+                asyncio.to_thread(self.structured.search, filters)
+                for filters in filters_list
+            )),
+            asyncio.to_thread(self.semantic.search_batch, queries),
+        )
 
-        return ChunkMerger.merge(structured_chunks, semantic_chunks)
\ No newline at end of file
+        return [
+            ChunkMerger.merge(structured_chunks, semantic_chunks)
+            for structured_chunks, semantic_chunks in zip(structured_batches, semantic_batches)
+        ]
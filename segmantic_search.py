@@ -1,5 +1,5 @@
 from typing import List
-from app.rag.models import Chunk
+from app.rag.models import Chunk, intern_str
 
 class SemanticSearcher:
     def __init__(self, weaviate_client, embedder):
@@ -8,7 +8,14 @@ class SemanticSearcher:
 
     def search(self, query: str, limit: int = 8) -> List[Chunk]:
         vector = self.embedder.embed(query)
+        return self.search_vector(vector, limit=limit)
 
+    def search_batch(self, queries: List[str], limit: int = 8) -> List[List[Chunk]]:
+        # One embedding call for the whole batch
+        vectors = self.embedder.embed_batch(queries)
+        return [self.search_vector(v, limit=limit) for v in vectors]
+
+    def search_vector(self, vector, limit: int = 8) -> List[Chunk]:
         results = self.wv.semantic_search(vector, limit=limit)
 
         if not results:
@@ -21,10 +28,10 @@ class SemanticSearcher:
             chunks.append(
                 Chunk(
                     chunk_id=int(props["chunk_id"]),
-                    project=props["project"],
-                    mpu_name=props["mpu_name"],
+                    project=intern_str(props["project"]),
+                    mpu_name=intern_str(props["mpu_name"]),
                     rg_index=props["rg_index"],
-                    profile=props["profile"],
+                    profile=intern_str(props["profile"]),
                     start_hex=props["start"],
                     end_hex=props["end"],
                     chunk_text=props["chunk_text"],
@@ -31,7 +31,7 @@ def run_rag_pipeline(req):
             "version": version
         }
 
-        chunks = self.router.retrieve_chunks(query, filters)
+        chunks = await self.router.retrieve_chunks(query, filters)
 
         if not chunks:
             return {
@@ -44,4 +44,41 @@ def run_rag_pipeline(req):
         return {
             "answer": context_text,
             "needs_context": False
-        }
\ No newline at end of file
+        }
+
+    async def answer_batch(self, queries: list) -> list:
+        results = [None] * len(queries)
+        pending = []
+
+        for i, query in enumerate(queries):
+            project, version, clarification = self.context.resolve(query)
+
+            if clarification:
+                results[i] = {
+                    "answer": clarification,
+                    "needs_context": True
+                }
+            else:
+                pending.append((i, query, {"project": project, "version": version}))
+
+        if pending:
+            # One retrieval round (single batched embed) for every resolved query
+            batches = await self.router.retrieve_chunks_batch(
+                [query for _, query, _ in pending],
+                [filters for _, _, filters in pending],
+            )
+
+            for (i, _, _), chunks in zip(pending, batches):
+                if not chunks:
+                    results[i] = {
+                        "answer": "No matching policy found.",
+                        "needs_context": False
+                    }
+                    continue
+
+                results[i] = {
+                    "answer": "\n".join(c.chunk_text for c in chunks[:6]),
+                    "needs_context": False
+                }
+
+        return results
\ No newline at end of file
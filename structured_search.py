@@ -20,7 +20,7 @@ def fetch_chunks(pg, vector_hits, project=None, version=None):
 
 
 from typing import List
-from app.rag.models import Chunk
+from app.rag.models import Chunk, intern_str
 
 class StructuredSearcher:
     def __init__(self, pg):
@@ -38,10 +38,10 @@ class StructuredSearcher:
             chunks.append(
                 Chunk(
                     chunk_id=r["id"],
-                    project=r["project"],
-                    mpu_name=r["mpu_name"],
+                    project=intern_str(r["project"]),
+                    mpu_name=intern_str(r["mpu_name"]),
                     rg_index=r["rg_index"],
-                    profile=r["profile"],
+                    profile=intern_str(r["profile"]),
                     start_hex=r["start_hex"],
                     end_hex=r["end_hex"],
                     chunk_text=r["chunk_text"],
@@ -0,0 +1,127 @@
+import asyncio
+import time
+
+import pytest
+
+from rag import latest_executor
+from rag.latest_executor import Executor
+
+
+SQL_ROW = {"addr_start": 0x1000, "addr_end": 0x1FFF, "profile": "TZ"}
+VECTOR_HIT = {"chunk_text": "semantic hit"}
+
+
+class FakeSQL:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = 0
+
+    def fetch_policies(self, params):
+        self.calls += 1
+        time.sleep(params.get("delay", 0))
+        return [dict(r) for r in params.get("rows", self.rows)]
+
+
+class FakeVector:
+    def __init__(self):
+        self.calls = 0
+
+    def semantic_search(self, query_text, filters, top_k):
+        self.calls += 1
+        return [dict(VECTOR_HIT)]
+
+
+@pytest.fixture(autouse=True)
+def fake_classifier(monkeypatch):
+    monkeypatch.setattr(
+        latest_executor,
+        "_classify_policy",
+        lambda start, end, profile: {"policy_class": profile},
+    )
+
+
+def fallback_plan():
+    return [
+        {"action": "SQL_SEARCH", "params": {}, "depends_on": []},
+        {
+            "action": "VECTOR_SEARCH",
+            "params": {"semantic_query": "ipa mpu"},
+            "depends_on": [0],
+        },
+    ]
+
+
+def run_both(sql_rows, plan):
+    sync = Executor(FakeSQL(sql_rows), FakeVector(), llm=None)
+    async_ = Executor(FakeSQL(sql_rows), FakeVector(), llm=None)
+    return sync, sync.run(plan), async_, asyncio.run(async_.arun(plan))
+
+
+def test_sql_rows_skip_vector_search():
+    sync, result, _, async_result = run_both([SQL_ROW], fallback_plan())
+
+    assert result == [{**SQL_ROW, "policy_class": "TZ"}]
+    assert sync.vector.calls == 0
+    assert async_result == result
+
+
+def test_empty_sql_falls_back_to_vector_search():
+    sync, result, async_, async_result = run_both([], fallback_plan())
+
+    assert result == [VECTOR_HIT]
+    assert sync.vector.calls == 1
+    assert async_.vector.calls == 1
+    assert async_result == result
+
+
+def test_skipped_dependency_skips_dependent_step():
+    plan = [
+        {"action": "SQL_SEARCH", "params": {}, "depends_on": [2]},
+        {
+            "action": "VECTOR_SEARCH",
+            "params": {"semantic_query": "ipa mpu"},
+            "depends_on": [0],
+        },
+        {"action": "SQL_SEARCH", "params": {}, "depends_on": []},
+    ]
+
+    sync, result, async_, async_result = run_both([SQL_ROW], plan)
+
+    # Step 0 depends on a later step, so steps 0 and 1 never run
+    assert sync.sql.calls == 1 and sync.vector.calls == 0
+    assert async_.sql.calls == 1 and async_.vector.calls == 0
+    assert result == [{**SQL_ROW, "policy_class": "TZ"}]
+    assert async_result == result
+
+
+def test_clarify_stops_the_plan():
+    plan = [
+        {"action": "CLARIFY", "params": {"reason": "Missing intent"}},
+        {"action": "SQL_SEARCH", "params": {}, "depends_on": []},
+    ]
+
+    sync, result, async_, async_result = run_both([SQL_ROW], plan)
+
+    assert result == [] and async_result == []
+    assert sync.sql.calls == 0 and async_.sql.calls == 0
+
+
+def test_concurrent_aruns_on_one_executor_stay_separate():
+    executor = Executor(FakeSQL([]), FakeVector(), llm=None)
+
+    def plan(rows, delay):
+        steps = fallback_plan()
+        steps[0]["params"] = {"rows": rows, "delay": delay}
+        return steps
+
+    async def both():
+        # The slow empty-SQL run is still collecting when the fast one starts
+        return await asyncio.gather(
+            executor.arun(plan([], 0.05)),
+            executor.arun(plan([SQL_ROW], 0)),
+        )
+
+    fallback, sql = asyncio.run(both())
+
+    assert fallback == [VECTOR_HIT]
+    assert sql == [{**SQL_ROW, "policy_class": "TZ"}]
@@ -0,0 +1,39 @@
+from rag.intentclass import ProductionIntentClassifier, Route
+
+
+def classify(query):
+    return ProductionIntentClassifier().classify(query).route
+
+
+def test_show_is_not_read_as_how():
+    # "show" used to contain "how" and force the LLM route
+    assert classify("Show region 4 for KAANAPALI") == Route.TAG
+
+
+def test_inflected_lookup_verbs_route_to_tag():
+    assert classify("Which domains are accessible at 0xc2630000?") == Route.TAG
+    assert classify("Shows the policy at 0xc2630000") == Route.TAG
+    assert classify("Lists permissions for region 3") == Route.TAG
+    assert classify("Policy fetched for 0x01D24000 - 0x01D32000") == Route.TAG
+    assert classify("Who accessed 0xc2630000?") == Route.TAG
+
+
+def test_explain_wins_over_lookup():
+    assert classify("Explain the access permissions for 0xc2630000") == Route.LLM
+    assert classify("Why does region 3 give write access?") == Route.LLM
+    assert classify("What is the policy at 0xc2630000?") == Route.LLM
+
+
+def test_inflected_explain_verbs_route_to_llm():
+    assert classify("Get 0xc2630000 compared to region 2") == Route.LLM
+    assert classify("Show region 3 as described in the design doc") == Route.LLM
+
+
+def test_no_selector_falls_back_to_llm():
+    assert classify("Get the policy for IPA MPU") == Route.LLM
+    assert classify("0xc2630000") == Route.LLM
+
+
+def test_verbs_match_whole_words_only():
+    # "forget" / "settings" must not count as "get"
+    assert classify("Forget settings at 0xc2630000") == Route.LLM
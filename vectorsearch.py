@@ -1,3 +1,4 @@
+from contextlib import contextmanager
 from typing import Dict, List, Optional
 from psycopg2.extras import RealDictCursor
 import numpy as np
@@ -86,12 +87,32 @@ class VectorExecutor:
     """
 
     def __init__(self, connection):
+        """
+        connection: a psycopg2 connection, or a pool (getconn/putconn,
+        e.g. ThreadedConnectionPool) to borrow one per search so
+        concurrent callers never share a connection.
+        """
         self.conn = connection
 
+    @contextmanager
+    def _connection(self):
+        if not hasattr(self.conn, "getconn"):
+            yield self.conn
+            return
+
+        conn = self.conn.getconn()
+        try:
+            yield conn
+        finally:
+            # Read-only: end the transaction before handing it back
+            conn.rollback()
+            self.conn.putconn(conn)
+
     def search(self, sql: str, params: List):
-        with self.conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(sql, params)
-            return cur.fetchall()
+        with self._connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute(sql, params)
+                return cur.fetchall()
 
 
 class VectorRepository:
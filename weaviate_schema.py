@@ -14,7 +14,9 @@ def ensure_schema(client):
         description="Policy chunks for semantic retrieval",
         vectorizer_config=Configure.Vectorizer.none(),
         vector_index_config=Configure.VectorIndex.hnsw(
-            distance_metric=VectorDistances.COSINE
+            distance_metric=VectorDistances.COSINE,
+            # Product quantization keeps compressed vectors in the HNSW cache
+            quantizer=Configure.VectorIndex.Quantizer.pq(),
         ),
         properties=[
             Property("chunk_id", DataType.INT),